@@ -0,0 +1,213 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, run_db
+from models import AuditLog
+from tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
+
+AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", "10000"))
+# What to do when the queue is full: "block" the caller, "drop_oldest" or "drop_newest".
+AUDIT_OVERFLOW_POLICY = os.environ.get("AUDIT_OVERFLOW_POLICY", "block")
+AUDIT_MAX_RETRIES = int(os.environ.get("AUDIT_MAX_RETRIES", "5"))
+
+def insert_events(db: Session, events: list):
+    db.execute(insert(AuditLog), events)
+    db.commit()
+
+class AuditWriter:
+    def __init__(self, batch_size: int = AUDIT_BATCH_SIZE, flush_interval: float = AUDIT_FLUSH_INTERVAL,
+                 max_queue: int = AUDIT_QUEUE_SIZE, overflow_policy: str = AUDIT_OVERFLOW_POLICY):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closing = False
+        self._flush_requested = False
+        self._in_flight = 0
+        self._space_waiters = []
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    def _event(self, user: str, action: str, resource: str, details: str = None, ip_address: str = None):
+        return {
+            # Captured here; the writer thread runs outside the request's tenant scope.
+            "tenant_id": current_tenant.get(),
+            "user": user,
+            "action": action,
+            "resource": resource,
+            "details": details,
+            "ip_address": ip_address,
+            "created_at": datetime.utcnow(),
+        }
+
+    def _enqueue(self, event: dict, waiter: tuple = None):
+        # With a (loop, future) waiter, a full queue under the "block" policy parks the future instead of
+        # blocking; the writer resolves it once a batch frees space, and the caller tries again.
+        with self._cond:
+            self._ensure_started()
+            while len(self._queue) >= self.max_queue:
+                if self.overflow_policy == "drop_newest":
+                    self.dropped += 1
+                    return True
+                if self.overflow_policy == "drop_oldest":
+                    self._queue.popleft()
+                    self.dropped += 1
+                    break
+                if waiter is not None:
+                    self._space_waiters.append(waiter)
+                    return False
+                self._cond.notify_all()
+                self._cond.wait(0.1)
+            self._queue.append(event)
+            self.enqueued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+            return True
+
+    def _write_durable(self, events: list):
+        self._write(events)
+        self._count_written(len(events))
+
+    def _count_written(self, count: int):
+        with self._cond:
+            self.written += count
+
+    def log(self, user: str, action: str, resource: str, details: str = None, ip_address: str = None, durable: bool = False):
+        # For worker threads and scripts; request handlers use log_async.
+        event = self._event(user, action, resource, details=details, ip_address=ip_address)
+        if durable:
+            self._write_durable([event])
+        else:
+            self._enqueue(event)
+
+    async def log_async(self, user: str, action: str, resource: str, details: str = None, ip_address: str = None, durable: bool = False):
+        event = self._event(user, action, resource, details=details, ip_address=ip_address)
+        if durable:
+            # Security-relevant events are committed before the caller continues. Database.run keeps the
+            # commit off the event loop: a worker thread, or AsyncSession with DB_ASYNC.
+            await run_db(insert_events, [event])
+            self._count_written(1)
+            return
+        loop = asyncio.get_running_loop()
+        while True:
+            future = loop.create_future()
+            if self._enqueue(event, waiter=(loop, future)):
+                return
+            await future
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def _write(self, events: list):
+        with SessionLocal() as db:
+            insert_events(db, events)
+
+    def _take_batch(self):
+        with self._cond:
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._queue) < self.batch_size and not (self._closing or self._flush_requested):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            if not self._queue:
+                self._flush_requested = False
+            self._in_flight = len(batch)
+            self._cond.notify_all()
+            self._wake_space_waiters()
+            return batch
+
+    def _wake_space_waiters(self):
+        waiters, self._space_waiters = self._space_waiters, []
+        for loop, future in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_resolve, future)
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._flush_batch(batch)
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+                if self._closing and not self._queue:
+                    return
+
+    def _flush_batch(self, batch: list):
+        for attempt in range(AUDIT_MAX_RETRIES):
+            try:
+                self._write(batch)
+                with self._cond:
+                    self.written += len(batch)
+                return
+            except Exception:
+                with self._cond:
+                    self.failed_batches += 1
+                logger.exception("Audit batch of %d events failed (attempt %d)", len(batch), attempt + 1)
+                time.sleep(min(2 ** attempt * 0.1, 5))
+        with self._cond:
+            self.dropped += len(batch)
+
+    def flush(self, timeout: float = 10.0):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if self._thread is None:
+                return not self._queue
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._queue or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.notify_all()
+                self._cond.wait(min(remaining, 0.05))
+        return True
+
+    def close(self, timeout: float = 10.0):
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed_batches": self.failed_batches
+            }
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+audit_writer = AuditWriter()
+
+async def audit(user: str, action: str, resource: str, details: str = None, ip_address: str = None, durable: bool = False):
+    await audit_writer.log_async(user, action, resource, details=details, ip_address=ip_address, durable=durable)
@@ -1,53 +1,128 @@
 import os
 import jwt
+import time
+import uuid
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from fastapi import HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from tenancy import DEFAULT_TENANT, current_tenant
+
 SECRET_KEY = os.environ.get("SESSION_SECRET", "demo-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "4096"))
 
 USERS = {
-    "admin": {"password": "admin123", "role": "admin", "name": "Admin User"},
-    "viewer": {"password": "viewer123", "role": "viewer", "name": "Viewer User"}
+    "admin": {"password": "admin123", "role": "admin", "name": "Admin User", "tenant": DEFAULT_TENANT},
+    "viewer": {"password": "viewer123", "role": "viewer", "name": "Viewer User", "tenant": DEFAULT_TENANT}
 }
 
 security = HTTPBearer(auto_error=False)
 
+class TokenCache:
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._revoked = {}
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return payload
+
+    def put(self, token: str, payload: dict):
+        with self._lock:
+            self._entries[token] = (payload, payload.get("exp", 0))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def is_revoked(self, payload: dict):
+        return payload.get("jti") in self._revoked
+
+    def revoke(self, token: str, payload: dict):
+        with self._lock:
+            self._entries.pop(token, None)
+            jti = payload.get("jti")
+            if jti:
+                self._revoked[jti] = payload.get("exp", 0)
+            # A revoked token only matters until it would have expired anyway.
+            now = time.time()
+            for expired in [key for key, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[expired]
+
+token_cache = TokenCache()
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def verify_token(token: str):
+def decode_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+def verify_token(token: str):
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_token(token)
+        token_cache.put(token, payload)
+    if token_cache.is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return payload
+
+def revoke_token(token: str):
+    try:
+        payload = verify_token(token)
+    except HTTPException:
+        return False
+    token_cache.revoke(token, payload)
+    return True
+
 def authenticate_user(username: str, password: str):
     user = USERS.get(username)
     if user and user["password"] == password:
-        return {"username": username, "role": user["role"], "name": user["name"]}
+        return {"username": username, "role": user["role"], "name": user["name"], "tenant": user.get("tenant", DEFAULT_TENANT)}
     return None
 
-async def get_current_user(request: Request):
+def get_request_token(request: Request):
     token = request.cookies.get("access_token")
     
     if not token:
         auth_header = request.headers.get("authorization")
         if auth_header and auth_header.startswith("Bearer "):
             token = auth_header.split(" ")[1]
+    return token
+
+async def get_current_user(request: Request):
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
     
+    token = get_request_token(request)
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     payload = verify_token(token)
+    request.state.user = payload
+    # Every query the request makes from here on is scoped to this tenant.
+    current_tenant.set(payload.get("tenant", DEFAULT_TENANT))
     return payload
 
 async def get_admin_user(request: Request):
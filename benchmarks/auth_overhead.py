@@ -0,0 +1,66 @@
+"""Per-request auth overhead: uncached JWT decoding vs. the verified-token cache.
+
+Run from the repository root:
+
+    python benchmarks/auth_overhead.py --requests 20000
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request
+
+import auth
+
+def make_request(token: str):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/sync/stripe",
+        "headers": [(b"cookie", f"access_token={token}".encode())],
+        "query_string": b"",
+    }
+    return Request(scope)
+
+async def uncached_admin_request(token: str):
+    # What every admin request paid before: get_admin_user decoded via get_current_user,
+    # and the handler's own get_current_user call decoded again.
+    request = make_request(token)
+    for _ in range(2):
+        payload = auth.decode_token(request.cookies.get("access_token"))
+    if payload.get("role") != "admin":
+        raise RuntimeError("expected an admin token")
+
+async def cached_admin_request(token: str):
+    request = make_request(token)
+    await auth.get_admin_user(request)
+    await auth.get_current_user(request)
+
+async def measure(fn, token: str, requests: int):
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await fn(token)
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    samples.sort()
+    return {
+        "mean_us": round(statistics.fmean(samples), 2),
+        "p50_us": round(samples[len(samples) // 2], 2),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1], 2),
+    }
+
+async def main(requests: int):
+    token = auth.create_access_token({"sub": "admin", "role": "admin", "name": "Admin User"})
+    for label, fn in [("before (decode per call)", uncached_admin_request), ("after (token cache)", cached_admin_request)]:
+        await measure(fn, token, min(requests, 1000))
+        print(f"{label:28} {await measure(fn, token, requests)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    asyncio.run(main(parser.parse_args().requests))
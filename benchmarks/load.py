@@ -0,0 +1,312 @@
+"""Latency/throughput benchmarks for the dashboard, metrics, orders, search, login, sync and webhook endpoints.
+
+Each scenario (backend x seeded row count) gets a fresh database seeded with
+mockgen, a uvicorn server in its own process, and local stubs standing in for
+Stripe, GitHub and OpenWeather. Run from the repository root:
+
+    python benchmarks/load.py --sizes 10000,100000 --output benchmarks/results.json
+    python benchmarks/load.py --baseline benchmarks/baseline.json --save-baseline
+    python benchmarks/load.py --baseline benchmarks/baseline.json    # exits 1 on regression
+
+PostgreSQL runs need a scratch database (a local server, or any Postgres-compatible
+stand-in); its application tables are dropped and recreated:
+
+    python benchmarks/load.py --backends sqlite,postgres --postgres-url postgresql://bench@localhost/bench
+"""
+import os
+import re
+import sys
+import hmac
+import json
+import math
+import time
+import hashlib
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stubs
+
+SEED = 42
+SYNC_SOURCES = ("orders", "stripe", "github", "weather")
+SEED_KINDS = ("orders", "stripe_payments", "github_issues")
+WEBHOOK_SECRET = "whsec_bench"
+
+def seed_database(rows: int):
+    # Runs in a child process so DATABASE_URL is read fresh by database.py.
+    from database import Base, engine
+    from search import ensure_search_index
+    import mockgen
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    for kind in SEED_KINDS:
+        mockgen.load(kind, rows, seed=SEED)
+    mockgen.load("weather", max(rows // 10, 1), seed=SEED)
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(samples: list, fraction: float):
+    return samples[max(0, min(len(samples) - 1, math.ceil(fraction * len(samples)) - 1))]
+
+def summarize(endpoint: str, samples: list, errors: int, elapsed: float):
+    samples = sorted(samples)
+    return {
+        "endpoint": endpoint,
+        "requests": len(samples) + errors,
+        "errors": errors,
+        "p50_ms": round(percentile(samples, 0.50), 2) if samples else None,
+        "p95_ms": round(percentile(samples, 0.95), 2) if samples else None,
+        "p99_ms": round(percentile(samples, 0.99), 2) if samples else None,
+        "mean_ms": round(sum(samples) / len(samples), 2) if samples else None,
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else None,
+    }
+
+async def measure(endpoint: str, send, requests: int, concurrency: int):
+    samples, errors = [], 0
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with limit:
+            started = time.perf_counter()
+            try:
+                ok = await send()
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                samples.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return summarize(endpoint, samples, errors, time.perf_counter() - started)
+
+async def order_page_urls(client: httpx.AsyncClient, depth: int):
+    urls = ["/orders"]
+    while len(urls) < depth:
+        response = await client.get(urls[-1])
+        match = re.search(r'href="(/orders\?after=[^"&]+)"', response.text)
+        if not match:
+            break
+        urls.append(match.group(1))
+    return urls
+
+async def run_sync(client: httpx.AsyncClient, source: str):
+    response = await client.post(f"/api/sync/{source}")
+    if response.status_code != 202:
+        return False
+    job_id = response.json()["job_id"]
+    while True:
+        job = (await client.get(f"/api/sync/jobs/{job_id}")).json()
+        if job["status"] in ("succeeded", "failed"):
+            return job["status"] == "succeeded"
+        await asyncio.sleep(0.01)
+
+def stripe_delivery(n: int):
+    body = json.dumps({
+        "id": f"evt_bench_{n}",
+        "type": "charge.updated",
+        "data": {"object": {
+            "id": f"ch_hook_{n % 5000}", "amount": 1000 + n % 5000, "currency": "usd", "status": "succeeded",
+            "created": 1700000000 + n, "billing_details": {"email": "bench@example.com"}, "description": "Webhook charge"
+        }},
+    }).encode()
+    timestamp = str(int(time.time()))
+    signature = hmac.new(WEBHOOK_SECRET.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+    return body, {"Stripe-Signature": f"t={timestamp},v1={signature}", "Content-Type": "application/json"}
+
+async def drive(base_url: str, args):
+    connections = max(args.concurrency, args.webhook_concurrency)
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        login = await client.post("/login", data={"username": "admin", "password": "admin123"})
+        client.cookies.set("access_token", login.cookies["access_token"])
+
+        async def get(url):
+            return (await client.get(url)).status_code == 200
+
+        async def do_login():
+            async with httpx.AsyncClient(base_url=base_url) as fresh:
+                response = await fresh.post("/login", data={"username": "admin", "password": "admin123"})
+                return response.status_code == 302
+
+        deliveries = iter(range(10 ** 9))
+
+        async def deliver():
+            body, headers = stripe_delivery(next(deliveries))
+            return (await client.post("/webhooks/stripe", content=body, headers=headers)).status_code == 200
+
+        pages = await order_page_urls(client, args.page_depth)
+        results = [
+            await measure("GET /dashboard", lambda: get("/dashboard"), args.requests, args.concurrency),
+            await measure("GET /api/metrics", lambda: get("/api/metrics"), args.requests, args.concurrency),
+            await measure(f"GET /orders?page={len(pages)}", lambda: get(pages[-1]), args.requests, args.concurrency),
+            await measure("GET /api/search", lambda: get("/api/search?q=velocity+corp"), args.requests, args.concurrency),
+            await measure("POST /login", do_login, args.requests, args.concurrency),
+            # Deliveries wait for a group commit, so throughput comes from many senders at once.
+            await measure("POST /webhooks/stripe", deliver, args.webhook_requests, args.webhook_concurrency),
+        ]
+        for source in SYNC_SOURCES:
+            # Syncs are single-flight per source, so they are timed end to end one at a time.
+            results.append(await measure(f"POST /api/sync/{source}", lambda: run_sync(client, source), args.sync_requests, 1))
+        return results
+
+def wait_until_ready(base_url: str, process, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("benchmark server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/login", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("benchmark server did not start")
+
+def run_scenario(backend: str, database_url: str, rows: int, stub_server, args):
+    env = {
+        **os.environ, **stubs.stub_environment(stub_server), "DATABASE_URL": database_url,
+        "STRIPE_WEBHOOK_SECRET": WEBHOOK_SECRET, "GITHUB_WEBHOOK_SECRET": WEBHOOK_SECRET,
+    }
+    if args.cold:
+        env.update({"PAGE_CACHE_TTL": "0", "METRICS_CACHE_TTL": "0"})
+    if args.async_db:
+        env["DB_ASYNC"] = "true"
+
+    started = time.perf_counter()
+    subprocess.run([sys.executable, os.path.abspath(__file__), "--seed-only", str(rows)], cwd=ROOT, env=env, check=True)
+    print(f"[{backend} {rows:,}] seeded in {time.perf_counter() - started:.1f}s", flush=True)
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_ready(base_url, server)
+        results = asyncio.run(drive(base_url, args))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    for result in results:
+        result.update({"backend": backend, "rows": rows})
+        print(
+            f"[{backend} {rows:,}] {result['endpoint']:28} p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms  "
+            f"p99 {result['p99_ms']}ms  {result['throughput_rps']} req/s  errors {result['errors']}",
+            flush=True
+        )
+    return results
+
+def _key(result: dict):
+    return (result["backend"], result["rows"], result["endpoint"])
+
+def compare(results: list, baseline: list, threshold: float):
+    previous = {_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(_key(result))
+        if before is None or result["p95_ms"] is None or before["p95_ms"] is None:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{_key(result)}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if before["throughput_rps"] and result["throughput_rps"] < before["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{_key(result)}: throughput {before['throughput_rps']} -> {result['throughput_rps']} req/s")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{_key(result)}: errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+def main(args):
+    backends = {}
+    for backend in args.backends.split(","):
+        if backend == "sqlite":
+            backends["sqlite"] = None
+        elif backend == "postgres":
+            if not args.postgres_url:
+                print("Skipping postgres: pass --postgres-url or set BENCH_POSTGRES_URL", flush=True)
+                continue
+            backends["postgres"] = args.postgres_url
+
+    stub_server = stubs.start(latency_ms=args.stub_latency_ms, records=args.stub_records)
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for backend, database_url in backends.items():
+            for rows in [int(size) for size in args.sizes.split(",")]:
+                url = database_url or f"sqlite:///{scratch}/bench_{rows}.db"
+                results.extend(run_scenario(backend, url, rows, stub_server, args))
+    stub_server.shutdown()
+
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cold": args.cold,
+            "async_db": args.async_db,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as out:
+        json.dump(report, out, indent=2)
+    print(f"Wrote {args.output}")
+
+    if not args.baseline:
+        return 0
+    if args.save_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as out:
+            json.dump(report, out, indent=2)
+        print(f"Saved baseline {args.baseline}")
+        return 0
+    with open(args.baseline) as source:
+        regressions = compare(results, json.load(source)["results"], args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", default="sqlite,postgres")
+    parser.add_argument("--postgres-url", default=os.environ.get("BENCH_POSTGRES_URL"))
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--sync-requests", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--page-depth", type=int, default=10)
+    parser.add_argument("--webhook-requests", type=int, default=5000)
+    parser.add_argument("--webhook-concurrency", type=int, default=200)
+    parser.add_argument("--cold", action="store_true", help="disable the page and metrics caches")
+    parser.add_argument("--async-db", action="store_true", help="serve requests through AsyncSession (DB_ASYNC=true)")
+    parser.add_argument("--stub-latency-ms", type=float, default=20)
+    parser.add_argument("--stub-records", type=int, default=1000)
+    parser.add_argument("--output", default="benchmarks/results.json")
+    parser.add_argument("--baseline")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--seed-only", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.seed_only is not None:
+        seed_database(args.seed_only)
+        sys.exit(0)
+    sys.exit(main(args))
@@ -0,0 +1,221 @@
+"""Local HTTP stand-ins for the Stripe, GitHub and OpenWeather APIs.
+
+They implement just enough of each API for the sync paths in integrations.py:
+Stripe list pagination (limit, starting_after, created[gt], has_more), GitHub
+Link-header paging with since and ETag/If-None-Match, and per-city weather.
+
+Every response carries X-RateLimit-* headers. The stubs can also inject
+failures into a fraction of requests: 429 with Retry-After, a 5xx, or a
+hang. This exercises the retry, rate-limit and circuit-breaker paths.
+Faults can be changed while the stubs run with
+PUT /_stub/faults {"fault": "503", "fault_rate": 1.0}.
+
+    python benchmarks/stubs.py --port 8900 --latency-ms 20
+    python benchmarks/stubs.py --fault 503 --fault-rate 0.3 --rate-limit 100
+"""
+import json
+import time
+import random
+import calendar
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+STRIPE_EPOCH = 1700000000
+GITHUB_EPOCH = 1704067200
+
+def _github_time(offset: int):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(GITHUB_EPOCH + offset))
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body=None, headers: dict = None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in {**getattr(self, "rate_headers", {}), **(headers or {})}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _take_rate_limit(self):
+        server = self.server
+        with server.lock:
+            now = time.time()
+            if now >= server.window_reset:
+                server.window_reset = now + server.rate_window
+                server.window_used = 0
+            server.window_used += 1
+            remaining = server.rate_limit - server.window_used
+            self.rate_headers = {
+                "X-RateLimit-Limit": str(server.rate_limit),
+                "X-RateLimit-Remaining": str(max(remaining, 0)),
+                "X-RateLimit-Reset": str(int(server.window_reset)),
+            }
+            return remaining >= 0, server.window_reset - now
+
+    def _inject_fault(self):
+        server = self.server
+        with server.lock:
+            fault = server.fault if server.fault and server.rng.random() < server.fault_rate else None
+        if fault == "hang":
+            time.sleep(server.hang)
+            self.close_connection = True
+            return True
+        if fault == "429":
+            self._send(429, {"error": "rate limited"}, {"Retry-After": str(server.retry_after)})
+            return True
+        if fault:
+            self._send(int(fault), {"error": "injected failure"})
+            return True
+        return False
+
+    def do_PUT(self):
+        if urlparse(self.path).path != "/_stub/faults":
+            return self._send(404, {"error": "not found"})
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        set_faults(self.server, **body)
+        self._send(200, {"fault": self.server.fault, "fault_rate": self.server.fault_rate})
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.rate_limit:
+            allowed, reset_in = self._take_rate_limit()
+            if not allowed:
+                return self._send(429, {"error": "rate limit exceeded"}, {"Retry-After": str(max(int(reset_in + 0.999), 1))})
+        if self._inject_fault():
+            return
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path == "/v1/charges":
+            return self._charges(query)
+        if url.path.startswith("/repos/") and url.path.endswith("/issues"):
+            return self._issues(url.path, query)
+        if url.path == "/data/2.5/weather":
+            return self._weather(query)
+        self._send(404, {"error": "not found"})
+
+    def _charges(self, query: dict):
+        # Newest first, like the real API; charge n was created at STRIPE_EPOCH + n.
+        total = self.server.records
+        limit = int(query.get("limit", 10))
+        newest = total - 1
+        if "starting_after" in query:
+            newest = int(query["starting_after"].rsplit("_", 1)[1]) - 1
+        oldest = max(int(query.get("created[gt]", STRIPE_EPOCH - 1)) - STRIPE_EPOCH + 1, 0)
+        ids = list(range(newest, max(newest - limit, oldest - 1), -1))
+        self._send(200, {
+            "data": [
+                {
+                    "id": f"ch_stub_{n}",
+                    "amount": 1000 + (n * 37) % 50000,
+                    "currency": "usd",
+                    "status": "succeeded" if n % 10 else "pending",
+                    "billing_details": {"email": f"customer{n % 100}@example.com"},
+                    "description": f"Stub charge {n}",
+                    "created": STRIPE_EPOCH + n,
+                }
+                for n in ids
+            ],
+            "has_more": bool(ids) and ids[-1] > oldest,
+        })
+
+    def _issues(self, path: str, query: dict):
+        total = self.server.records
+        per_page = int(query.get("per_page", 30))
+        page = int(query.get("page", 1))
+        since = query.get("since")
+        first = 0
+        if since:
+            first = max(calendar.timegm(time.strptime(since, "%Y-%m-%dT%H:%M:%SZ")) - GITHUB_EPOCH, 0)
+        etag = f'"{total}-{first}-{per_page}-{page}"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304)
+        start = first + (page - 1) * per_page
+        numbers = range(start, min(start + per_page, total))
+        headers = {"ETag": etag}
+        if start + per_page < total:
+            next_query = f"per_page={per_page}&state=all&page={page + 1}" + (f"&since={since}" if since else "")
+            headers["Link"] = f'<http://{self.headers["Host"]}{path}?{next_query}>; rel="next"'
+        self._send(200, [
+            {
+                "id": 9000000 + n,
+                "title": f"Stub issue {n}",
+                "state": "open" if n % 3 else "closed",
+                "user": {"login": f"user{n % 50}"},
+                "labels": [{"name": "bug"}] if n % 2 else [],
+                "created_at": _github_time(n),
+                "updated_at": _github_time(n),
+            }
+            for n in numbers
+        ], headers)
+
+    def _weather(self, query: dict):
+        seed = sum(map(ord, query.get("q", "")))
+        self._send(200, {
+            "main": {"temp": seed % 30, "feels_like": seed % 30 - 1, "humidity": 40 + seed % 50},
+            "weather": [{"description": "clear sky"}],
+            "wind": {"speed": seed % 15},
+        })
+
+def set_faults(server, fault: str = None, fault_rate: float = 1.0, retry_after: int = 1, hang: float = 30.0):
+    # fault is "429", a 5xx status such as "500" or "503", "hang", or None to answer normally.
+    with server.lock:
+        server.fault = str(fault) if fault else None
+        server.fault_rate = fault_rate
+        server.retry_after = retry_after
+        server.hang = hang
+
+def start(port: int = 0, latency_ms: float = 0, records: int = 1000, rate_limit: int = 0, rate_window: float = 60, seed: int = 0, **faults):
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.records = records
+    server.lock = threading.Lock()
+    server.rng = random.Random(seed)
+    server.rate_limit = rate_limit
+    server.rate_window = rate_window
+    server.window_reset = 0.0
+    server.window_used = 0
+    set_faults(server, **faults)
+    threading.Thread(target=server.serve_forever, name="api-stubs", daemon=True).start()
+    return server
+
+def stub_environment(server):
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return {
+        "STRIPE_API_KEY": "sk_test_stub",
+        "GITHUB_TOKEN": "stub-token",
+        "OPENWEATHER_API_KEY": "stub-key",
+        "STRIPE_API_BASE": base,
+        "GITHUB_API_BASE": base,
+        "OPENWEATHER_API_BASE": base,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests allowed per --rate-window seconds (0 = unlimited)")
+    parser.add_argument("--rate-window", type=float, default=60)
+    parser.add_argument("--fault", choices=["429", "500", "502", "503", "504", "hang"])
+    parser.add_argument("--fault-rate", type=float, default=1.0, help="fraction of requests that get --fault")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--hang", type=float, default=30.0, help="seconds a hung request stalls before the connection closes")
+    args = parser.parse_args()
+    server = start(
+        args.port, args.latency_ms, args.records, rate_limit=args.rate_limit, rate_window=args.rate_window,
+        fault=args.fault, fault_rate=args.fault_rate, retry_after=args.retry_after, hang=args.hang
+    )
+    print(f"Stubs listening on http://127.0.0.1:{server.server_address[1]}")
+    for name, value in stub_environment(server).items():
+        print(f"export {name}={value}")
+    threading.Event().wait()
@@ -0,0 +1,182 @@
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+
+from database import read_session
+from metrics import get_metrics_snapshot
+from tenancy import current_tenant, tenant_scope
+
+logger = logging.getLogger(__name__)
+
+SSE_HEARTBEAT_INTERVAL = float(os.environ.get("SSE_HEARTBEAT_INTERVAL", "15"))
+SSE_QUEUE_SIZE = int(os.environ.get("SSE_QUEUE_SIZE", "16"))
+SSE_MAX_CLIENTS = int(os.environ.get("SSE_MAX_CLIENTS", "10000"))
+# Syncs that commit in quick succession (e.g. backfill pages) are folded into one push.
+SSE_COALESCE_INTERVAL = float(os.environ.get("SSE_COALESCE_INTERVAL", "0.25"))
+
+def flatten_snapshot(snapshot: dict, prefix: str = ""):
+    flat = {}
+    for key, value in snapshot.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_snapshot(value, f"{path}."))
+        elif isinstance(value, datetime):
+            flat[path] = value.strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            flat[path] = value
+    return flat
+
+def format_event(event: str, data: dict, event_id: int = None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+class Subscriber:
+    def __init__(self, tenant: str, max_queue: int):
+        self.tenant = tenant
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def close(self):
+        # Drop whatever is pending so the end-of-stream marker always fits.
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+class MetricsBroadcaster:
+    def __init__(self, max_queue: int = SSE_QUEUE_SIZE, max_clients: int = SSE_MAX_CLIENTS):
+        self.max_queue = max_queue
+        self.max_clients = max_clients
+        self.version = 0
+        self._states = {}
+        self._subscribers = {}
+        self._dirty = set()
+        self._loop = None
+        self._changed = None
+        self._task = None
+        self._refresh_lock = asyncio.Lock()
+        self.computations = 0
+        self.published = 0
+        self.evicted = 0
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        for subscribers in self._subscribers.values():
+            for subscriber in list(subscribers):
+                subscriber.close()
+        self._subscribers.clear()
+        self._task = None
+        self._loop = None
+
+    def notify(self):
+        # Called after a sync commits; syncs may run off the event loop thread.
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._mark_dirty, current_tenant.get())
+
+    def _mark_dirty(self, tenant: str):
+        self._dirty.add(tenant)
+        self._changed.set()
+
+    def _compute(self, tenant: str):
+        with tenant_scope(tenant), read_session() as db:
+            return flatten_snapshot(get_metrics_snapshot(db))
+
+    async def _refresh(self, tenant: str, only_if_empty: bool = False):
+        async with self._refresh_lock:
+            current = self._states.get(tenant, {})
+            if only_if_empty and current:
+                return {}
+            state = await run_in_threadpool(self._compute, tenant)
+            self.computations += 1
+            delta = {key: value for key, value in state.items() if current.get(key) != value}
+            self._states[tenant] = state
+            if delta:
+                self.version += 1
+            return delta
+
+    async def _run(self):
+        while True:
+            await self._changed.wait()
+            await asyncio.sleep(SSE_COALESCE_INTERVAL)
+            self._changed.clear()
+            tenants, self._dirty = self._dirty, set()
+            for tenant in tenants:
+                if not self._subscribers.get(tenant):
+                    # Nobody is listening; the next subscriber fetches a fresh snapshot itself.
+                    self._states.pop(tenant, None)
+                    continue
+                try:
+                    delta = await self._refresh(tenant)
+                except Exception:
+                    logger.exception("Failed to compute metrics for live dashboards of %s", tenant)
+                    continue
+                if delta:
+                    self._publish(tenant, format_event("delta", delta, self.version))
+
+    def _publish(self, tenant: str, message: str):
+        subscribers = self._subscribers.get(tenant, set())
+        for subscriber in list(subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+                self.published += 1
+            except asyncio.QueueFull:
+                # A client that can't keep up is disconnected; it reconnects and gets a fresh snapshot.
+                subscribers.discard(subscriber)
+                subscriber.close()
+                self.evicted += 1
+
+    def client_count(self):
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    async def subscribe(self):
+        if self.client_count() >= self.max_clients:
+            return None
+        tenant = current_tenant.get()
+        if not self._states.get(tenant):
+            # Concurrent first subscribers share one computation.
+            await self._refresh(tenant, only_if_empty=True)
+        subscriber = Subscriber(tenant, self.max_queue)
+        subscriber.queue.put_nowait(format_event("snapshot", self._states[tenant], self.version))
+        self._subscribers.setdefault(tenant, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.get(subscriber.tenant, set()).discard(subscriber)
+
+    async def stream(self, subscriber: Subscriber):
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        return {
+            "clients": self.client_count(),
+            "version": self.version,
+            "computations": self.computations,
+            "published": self.published,
+            "evicted": self.evicted
+        }
+
+metrics_broadcaster = MetricsBroadcaster()
@@ -0,0 +1,55 @@
+import os
+import time
+import threading
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from database import run_db
+from models import DataVersion
+from ingest import dialect_insert
+from tenancy import current_tenant
+
+# How long a worker trusts its last read of the version before asking the database again.
+DATA_VERSION_CHECK_INTERVAL = float(os.environ.get("DATA_VERSION_CHECK_INTERVAL", "1"))
+
+def read_data_version(db: Session):
+    return db.execute(select(DataVersion.version)).scalar() or 0
+
+def bump_data_version(db: Session):
+    now = datetime.utcnow()
+    stmt = dialect_insert(db, DataVersion)
+    if stmt is not None:
+        db.execute(stmt.values(version=1, updated_at=now).on_conflict_do_update(
+            index_elements=["tenant_id"],
+            set_={"version": DataVersion.version + 1, "updated_at": now},
+        ))
+        return
+    if not db.execute(update(DataVersion).values(version=DataVersion.version + 1, updated_at=now)).rowcount:
+        db.add(DataVersion(version=1, updated_at=now))
+
+class DataVersions:
+    def __init__(self, check_interval: float = DATA_VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._versions = {}
+        self.reads = 0
+
+    async def current(self):
+        tenant = current_tenant.get()
+        with self._lock:
+            known = self._versions.get(tenant)
+            if known is not None and time.monotonic() - known[1] < self.check_interval:
+                return known[0]
+        version = await run_db(read_data_version)
+        with self._lock:
+            self._versions[tenant] = (version, time.monotonic())
+            self.reads += 1
+        return version
+
+    def forget(self, tenant: str = None):
+        # This worker just wrote; its next lookup goes back to the database instead of waiting out the interval.
+        with self._lock:
+            self._versions.pop(tenant or current_tenant.get(), None)
+
+data_versions = DataVersions()
@@ -1,26 +1,77 @@
 import os
-from sqlalchemy import create_engine
+import time
+import logging
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime
+from sqlalchemy import create_engine, inspect, text, make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from instrumentation import instrument_engine
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "300"))
+# Pre-ping costs a round trip per checkout; pool_recycle alone is usually enough behind a stable network.
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Reads go back to the primary when the replica is further behind than this, or this soon after a local write.
+DB_REPLICA_MAX_LAG = float(os.environ.get("DB_REPLICA_MAX_LAG", "5"))
+DB_REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get("DB_REPLICA_LAG_CHECK_INTERVAL", "2"))
+
+# Request handlers and sync jobs go through AsyncSession (asyncpg / aiosqlite) instead of a worker thread per query.
+DB_ASYNC = os.environ.get("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
 
 if not DATABASE_URL:
     DATABASE_URL = "sqlite:///./demo.db"
-    connect_args = {"check_same_thread": False}
-else:
-    connect_args = {}
-
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace(
-        "postgres://", "postgresql+psycopg2://", 1
-    )
-
-engine = create_engine(
-    DATABASE_URL,
-    pool_recycle=300,
-    pool_pre_ping=True,
-    connect_args=connect_args,
-)
+
+def _normalize_url(url: str):
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+psycopg2://", 1)
+    return url
+
+def _pool_options(url: str):
+    options = {"pool_recycle": DB_POOL_RECYCLE, "pool_pre_ping": DB_POOL_PRE_PING}
+    if ":memory:" not in url:
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+def _make_engine(url: str):
+    url = _normalize_url(url)
+    options = _pool_options(url)
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    new_engine = create_engine(url, **options)
+    instrument_engine(new_engine)
+    return new_engine
+
+def async_url(url: str):
+    url = make_url(_normalize_url(url))
+    url = url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+    sslmode = url.query.get("sslmode")
+    if sslmode:
+        # asyncpg takes ssl= rather than libpq's sslmode=.
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return url
+
+def _make_async_engine(url: str):
+    new_engine = create_async_engine(async_url(url), **_pool_options(url))
+    instrument_engine(new_engine.sync_engine)
+    return new_engine
+
+DATABASE_URL = _normalize_url(DATABASE_URL)
+engine = _make_engine(DATABASE_URL)
+replica_engine = _make_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -28,12 +79,187 @@ SessionLocal = sessionmaker(
     bind=engine,
 )
 
+ReplicaSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=replica_engine,
+) if replica_engine is not None else None
+
+async_engine = _make_async_engine(DATABASE_URL) if DB_ASYNC else None
+async_replica_engine = _make_async_engine(DATABASE_REPLICA_URL) if DB_ASYNC and DATABASE_REPLICA_URL else None
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+) if async_engine is not None else None
+
+AsyncReplicaSessionLocal = async_sessionmaker(
+    bind=async_replica_engine,
+    autoflush=False,
+    expire_on_commit=False,
+) if async_replica_engine is not None else None
+
+engines = {
+    "primary": engine,
+    "replica": replica_engine,
+    "primary_async": async_engine,
+    "replica_async": async_replica_engine,
+}
+
+PG_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+SYNC_WATERMARK_SQL = text("SELECT max(synced_at) FROM sync_logs")
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+class ReplicaRouter:
+    def __init__(self, max_lag: float = DB_REPLICA_MAX_LAG, check_interval: float = DB_REPLICA_LAG_CHECK_INTERVAL):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._last_write = 0.0
+        self._lag = None
+        self._checked_at = 0.0
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def note_write(self):
+        with self._lock:
+            self._last_write = time.monotonic()
+
+    def _measure_lag(self):
+        with replica_engine.connect() as replica:
+            if replica.dialect.name == "postgresql":
+                lag = replica.execute(PG_REPLICA_LAG_SQL).scalar()
+                return float(lag) if lag is not None else None
+            # Without a replication API, compare the newest sync each side has seen.
+            replica_mark = _as_datetime(replica.execute(SYNC_WATERMARK_SQL).scalar())
+        with engine.connect() as primary:
+            primary_mark = _as_datetime(primary.execute(SYNC_WATERMARK_SQL).scalar())
+        if primary_mark is None:
+            return 0.0
+        if replica_mark is None:
+            return None
+        return max((primary_mark - replica_mark).total_seconds(), 0.0)
+
+    def lag(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return self._lag
+            self._checked_at = now
+        try:
+            lag = self._measure_lag()
+        except Exception:
+            logger.warning("Replica lag check failed; reading from the primary", exc_info=True)
+            lag = None
+        with self._lock:
+            self._lag = lag
+        return lag
+
+    def use_replica(self):
+        if replica_engine is None:
+            return False
+        with self._lock:
+            recent_write = time.monotonic() - self._last_write < self.max_lag
+        lag = None if recent_write else self.lag()
+        use = not recent_write and lag is not None and lag <= self.max_lag
+        with self._lock:
+            if use:
+                self.replica_reads += 1
+            else:
+                self.primary_reads += 1
+        return use
+
+    def stats(self):
+        with self._lock:
+            return {
+                "configured": replica_engine is not None,
+                "lag_seconds": self._lag,
+                "replica_reads": self.replica_reads,
+                "primary_reads": self.primary_reads
+            }
+
+replica_router = ReplicaRouter()
+
 class Base(DeclarativeBase):
     pass
 
-def get_db():
-    db = SessionLocal()
+def ensure_columns():
+    # create_all never alters an existing table; add nullable columns declared since it was created.
+    existing = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not existing.has_table(table.name):
+                continue
+            present = {column["name"] for column in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present and column.nullable:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"))
+
+def ensure_indexes():
+    # create_all only creates indexes alongside new tables; add any declared later.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def read_session():
+    if replica_router.use_replica():
+        return ReplicaSessionLocal()
+    return SessionLocal()
+
+class Database:
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        # fn is ordinary Session code; AsyncSession drives it over the async driver, otherwise it gets a worker thread.
+        if isinstance(self.session, AsyncSession):
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def close(self):
+        if isinstance(self.session, AsyncSession):
+            await self.session.close()
+        else:
+            await run_in_threadpool(self.session.close)
+
+async def open_db(read: bool = False):
+    replica = read and replica_engine is not None and await run_in_threadpool(replica_router.use_replica)
+    if DB_ASYNC:
+        return Database((AsyncReplicaSessionLocal if replica else AsyncSessionLocal)())
+    return Database((ReplicaSessionLocal if replica else SessionLocal)(expire_on_commit=False))
+
+async def run_db(fn, *args, **kwargs):
+    db = await open_db()
+    try:
+        return await db.run(fn, *args, **kwargs)
+    finally:
+        await db.close()
+
+@asynccontextmanager
+async def db_session(read: bool = False):
+    db = await open_db(read=read)
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
+
+async def get_db():
+    async with db_session() as db:
+        yield db
+
+async def get_read_db():
+    async with db_session(read=True) as db:
+        yield db
+
+async def dispose_async_engines():
+    for async_db_engine in (async_engine, async_replica_engine):
+        if async_db_engine is not None:
+            await async_db_engine.dispose()
@@ -0,0 +1,148 @@
+import io
+import os
+import csv
+import json
+from datetime import datetime, date
+from sqlalchemy import select, Integer, Float, DateTime, Date
+
+from database import read_session
+from models import Order, StripePayment, GitHubIssue
+from tenancy import current_tenant
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", "5000"))
+
+# table name -> (model, column used by the status filter)
+EXPORT_TABLES = {
+    "orders": (Order, "status"),
+    "payments": (StripePayment, "status"),
+    "issues": (GitHubIssue, "state"),
+}
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+def build_query(table: str, status: str = None, created_after: datetime = None, created_before: datetime = None):
+    model, status_field = EXPORT_TABLES[table]
+    columns = list(model.__table__.columns)
+    # Plain table columns are not ORM entities, so the session's automatic tenant scoping does not reach them.
+    query = select(*columns).where(model.tenant_id == current_tenant.get()).order_by(model.id)
+    if status:
+        query = query.where(getattr(model, status_field) == status)
+    if created_after is not None:
+        query = query.where(model.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(model.created_at < created_before)
+    return query, [column.name for column in columns], columns
+
+def iter_row_chunks(query, chunk_size: int = EXPORT_CHUNK_SIZE):
+    # yield_per turns on a server-side cursor where the driver supports one (psycopg2),
+    # so only one chunk of plain row tuples is held in memory at a time.
+    with read_session() as db:
+        result = db.execute(query.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            yield rows
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def stream_csv(names: list, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def stream_ndjson(names: list, chunks):
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+    for rows in chunks:
+        yield "".join(
+            dumps({name: _json_value(value) for name, value in zip(names, row)}) + "\n"
+            for row in rows
+        ).encode()
+
+def _arrow_schema(columns: list):
+    fields = []
+    for column in columns:
+        if isinstance(column.type, Integer):
+            arrow_type = pyarrow.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pyarrow.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pyarrow.timestamp("us")
+        elif isinstance(column.type, Date):
+            arrow_type = pyarrow.date32()
+        else:
+            arrow_type = pyarrow.string()
+        fields.append(pyarrow.field(column.name, arrow_type))
+    return pyarrow.schema(fields)
+
+class _ChunkSink(io.RawIOBase):
+    # File-like target for the Arrow writers that hands back whatever was written since the last drain.
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+def stream_columnar(fmt: str, columns: list, chunks):
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="snappy")
+    else:
+        writer = pyarrow.ipc.new_stream(sink, schema)
+    for rows in chunks:
+        # One record batch (and one Parquet row group) per fetched chunk.
+        batch = pyarrow.RecordBatch.from_arrays(
+            [pyarrow.array([row[index] for row in rows], type=field.type) for index, field in enumerate(schema)],
+            schema=schema,
+        )
+        writer.write_batch(batch)
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+def export_stream(table: str, fmt: str, status: str = None, created_after: datetime = None, created_before: datetime = None):
+    query, names, columns = build_query(table, status, created_after, created_before)
+    chunks = iter_row_chunks(query)
+    if fmt == "csv":
+        return stream_csv(names, chunks)
+    if fmt == "ndjson":
+        return stream_ndjson(names, chunks)
+    return stream_columnar(fmt, columns, chunks)
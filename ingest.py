@@ -0,0 +1,153 @@
+import time
+from datetime import datetime
+from sqlalchemy import select, insert, update, or_, bindparam
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+
+from tenancy import TENANT_PARTITIONING, current_tenant
+
+LOOKUP_CHUNK_SIZE = 500
+
+def dialect_insert(db: Session, model):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    return None
+
+def chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _by_primary_key(model, row_id: int, values: dict):
+    values = {**values, "id": row_id}
+    if TENANT_PARTITIONING and hasattr(model, "tenant_id"):
+        # tenant_id is part of the primary key on partitioned tables.
+        values["tenant_id"] = current_tenant.get()
+    return values
+
+def _lookup(db: Session, columns: list, key_col, keys: list):
+    existing = {}
+    for chunk in chunks(keys, LOOKUP_CHUNK_SIZE):
+        for record in db.execute(select(*columns).where(key_col.in_(chunk))):
+            existing[record[1]] = record
+    return existing
+
+def _not_older(value, stored):
+    return stored is None or (value is not None and value >= stored)
+
+def newest_per_key(rows: list, key: str, version: str = None):
+    # Upstreams redeliver and reorder events: the newest version of each key wins, and ties go to the later row.
+    newest = {}
+    for row in rows:
+        current = newest.get(row[key])
+        if current is None or version is None or _not_older(row.get(version), current.get(version)):
+            newest[row[key]] = row
+    return newest
+
+def bulk_upsert(db: Session, model, key: str, rows: list, track: tuple = (), version: str = None):
+    # version: a column holding the upstream's modification time. A row older than the stored one is skipped as stale.
+    started = time.perf_counter()
+    key_col = getattr(model, key)
+
+    batch = newest_per_key(rows, key, version)
+    if not batch:
+        return {"inserted": 0, "updated": 0, "unchanged": 0, "elapsed_ms": 0.0, "changes": [], "stale": []}
+
+    fields = sorted({field for row in batch.values() for field in row if field != key})
+    tracked = [field for field in track if field not in fields]
+    columns = [model.id, key_col] + [getattr(model, field) for field in fields + tracked]
+    version_index = fields.index(version) + 2 if version in fields else None
+
+    existing = _lookup(db, columns, key_col, list(batch))
+
+    now = datetime.utcnow()
+    new_rows, changed_rows, touched_rows, row_changes, stale = [], [], [], [], []
+
+    def diff(row, current):
+        if version_index is not None:
+            if not _not_older(row.get(version), current[version_index]):
+                stale.append(row[key])
+                return
+        changes = {
+            field: row[field]
+            for index, field in enumerate(fields, start=2)
+            if field in row and field != version and row[field] != current[index]
+        }
+        if not changes:
+            if version_index is not None and row.get(version) != current[version_index]:
+                # Same state seen at a later time: keep the newer mark so older redeliveries stay stale.
+                touched_rows.append(_by_primary_key(model, current[0], {version: row[version], "incoming_version": row[version]}))
+            return
+        if version_index is not None:
+            changes[version] = changes["incoming_version"] = row[version]
+        if track:
+            before = dict(zip(fields + tracked, current[2:]))
+            after = {**before, **changes}
+            row_changes.append((
+                {field: before[field] for field in track},
+                {field: after[field] for field in track},
+            ))
+        changes["synced_at"] = now
+        changed_rows.append(_by_primary_key(model, current[0], changes))
+
+    for value, row in batch.items():
+        current = existing.get(value)
+        if current is None:
+            if hasattr(model, "created_at") and "created_at" not in row:
+                row = {**row, "created_at": now}
+            new_rows.append(row)
+        else:
+            diff(row, current)
+
+    if new_rows:
+        stmt = dialect_insert(db, model)
+        if stmt is not None:
+            stmt = stmt.on_conflict_do_nothing(
+                index_elements=["tenant_id", key] if hasattr(model, "tenant_id") else [key]
+            ).returning(key_col)
+            won = set(db.execute(stmt, new_rows).scalars())
+            raced = [row for row in new_rows if row[key] not in won]
+            if raced:
+                # A concurrent sync inserted these keys after our lookup. Diff against what it wrote,
+                # so the rollups see an update instead of counting the row a second time.
+                concurrent = _lookup(db, columns, key_col, [row[key] for row in raced])
+                for row in raced:
+                    diff(row, concurrent[row[key]])
+                new_rows = [row for row in new_rows if row[key] in won]
+        else:
+            db.execute(insert(model), new_rows)
+        if track:
+            row_changes.extend((None, {field: row.get(field) for field in track}) for row in new_rows)
+
+    if version_index is not None and (changed_rows or touched_rows):
+        # Re-checked in the UPDATE so a newer write committed since the lookup is not overwritten.
+        version_col = getattr(model, version)
+        db.execute(
+            update(model).where(or_(version_col.is_(None), version_col <= bindparam("incoming_version"))),
+            changed_rows + touched_rows,
+            execution_options={"synchronize_session": None},
+        )
+    elif changed_rows:
+        db.execute(update(model), changed_rows)
+
+    return {
+        "inserted": len(new_rows),
+        "updated": len(changed_rows),
+        "unchanged": len(batch) - len(new_rows) - len(changed_rows),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        "changes": row_changes,
+        "stale": stale,
+    }
+
+def bulk_insert(db: Session, model, rows: list):
+    started = time.perf_counter()
+    if rows:
+        db.execute(insert(model), rows)
+    return {
+        "inserted": len(rows),
+        "updated": 0,
+        "unchanged": 0,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
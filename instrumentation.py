@@ -0,0 +1,251 @@
+import os
+import time
+import logging
+import threading
+from contextvars import ContextVar
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Requests issuing more queries than this are counted and logged as likely N+1 patterns.
+QUERY_COUNT_THRESHOLD = int(os.environ.get("QUERY_COUNT_THRESHOLD", "25"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+_request_stats = ContextVar("request_stats", default=None)
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: tuple, values: tuple, extra: str = ""):
+    pairs = [f'{name}="{_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][index] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    bucket_labels = _format_labels(self.labels, labels, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                bucket_labels = _format_labels(self.labels, labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {round(series['sum'], 6)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {series['count']}")
+        return lines
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route.", ("method", "route", "status"))
+http_request_queries = Histogram(
+    "http_request_db_queries", "Database queries issued per request.", ("route",), QUERY_COUNT_BUCKETS)
+http_request_db_time = Histogram(
+    "http_request_db_seconds", "Database time spent per request.", ("route",))
+query_threshold_exceeded = Counter(
+    "http_requests_query_threshold_exceeded_total", "Requests issuing more than QUERY_COUNT_THRESHOLD queries (likely N+1).", ("route",))
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "Duration of individual SQL statements.", ("statement",), QUERY_BUCKETS)
+outbound_request_duration = Histogram(
+    "outbound_request_duration_seconds", "Latency of calls to external integrations.", ("integration", "status"))
+integration_retries = Counter(
+    "integration_retries_total", "Outbound requests retried after a 429, 5xx or connection error.", ("integration", "reason"))
+integration_fallbacks = Counter(
+    "integration_fallbacks_total", "Syncs served mock data because a configured live source failed.", ("integration", "reason"))
+integration_fetches = Counter(
+    "integration_fetches_total", "Integration fetches by outcome: miss (called upstream), hit (served from cache) or coalesced (joined a fetch already in flight).", ("source", "outcome"))
+
+METRICS = [
+    http_request_duration,
+    http_request_queries,
+    http_request_db_time,
+    query_threshold_exceeded,
+    db_query_duration,
+    outbound_request_duration,
+    integration_retries,
+    integration_fallbacks,
+    integration_fetches,
+]
+
+def _statement_type(statement: str):
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    return verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    db_query_duration.observe((_statement_type(statement),), elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats["queries"] += 1
+        stats["db_time"] += elapsed
+
+def _handle_error(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+def observe_outbound(integration: str, status, elapsed: float):
+    outbound_request_duration.observe((integration, str(status)), elapsed)
+
+def observe_retry(integration: str, reason: str):
+    integration_retries.inc((integration, reason))
+
+def observe_fallback(integration: str, reason: str):
+    integration_fallbacks.inc((integration, reason))
+
+def observe_fetch(source: str, outcome: str):
+    integration_fetches.inc((source, outcome))
+
+class InstrumentationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = {"queries": 0, "db_time": 0.0}
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Streaming bodies may still query after this, so the header is the count so far.
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-db-queries", str(stats["queries"]).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe((scope["method"], path, str(status)), time.perf_counter() - started)
+            http_request_queries.observe((path,), stats["queries"])
+            http_request_db_time.observe((path,), stats["db_time"])
+            if stats["queries"] > QUERY_COUNT_THRESHOLD:
+                query_threshold_exceeded.inc((path,))
+                logger.warning("%s %s issued %d queries (threshold %d)", scope["method"], path, stats["queries"], QUERY_COUNT_THRESHOLD)
+
+def _gauge(name: str, help_text: str, samples: list):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(('engine',), labels)} {value}")
+    return lines
+
+def _pool_gauges(engines: dict):
+    gauges = []
+    for name, reader, help_text in [
+        ("db_pool_size", "size", "Configured connection pool size."),
+        ("db_pool_checked_out", "checkedout", "Connections currently checked out."),
+        ("db_pool_checked_in", "checkedin", "Idle connections in the pool."),
+        ("db_pool_overflow", "overflow", "Connections open beyond the pool size."),
+    ]:
+        # QueuePool reports overflow as negative while below its size.
+        samples = [
+            ((label,), max(getattr(engine.pool, reader)(), 0))
+            for label, engine in engines.items()
+            if engine is not None and hasattr(engine.pool, reader)
+        ]
+        if samples:
+            gauges.extend(_gauge(name, help_text, samples))
+    return gauges
+
+def _replica_gauges(router):
+    stats = router.stats()
+    if not stats["configured"]:
+        return []
+    lines = []
+    if stats["lag_seconds"] is not None:
+        lines.extend([
+            "# HELP db_replica_lag_seconds Last measured replica lag.",
+            "# TYPE db_replica_lag_seconds gauge",
+            f"db_replica_lag_seconds {round(stats['lag_seconds'], 3)}",
+        ])
+    lines.extend([
+        "# HELP db_read_sessions_total Read-only sessions by the engine they were routed to.",
+        "# TYPE db_read_sessions_total counter",
+        f'db_read_sessions_total{{engine="replica"}} {stats["replica_reads"]}',
+        f'db_read_sessions_total{{engine="primary"}} {stats["primary_reads"]}',
+    ])
+    return lines
+
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+def _circuit_gauges(breakers: dict):
+    if not breakers:
+        return []
+    lines = [
+        "# HELP integration_circuit_state Circuit breaker state per integration (0 closed, 1 half-open, 2 open).",
+        "# TYPE integration_circuit_state gauge",
+    ]
+    for integration, breaker in sorted(breakers.items()):
+        lines.append(f'integration_circuit_state{{integration="{_label_value(integration)}"}} {CIRCUIT_STATES[breaker.state]}')
+    return lines
+
+def render_metrics(engines: dict, router=None, breakers: dict = None):
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    lines.extend(_pool_gauges(engines))
+    if router is not None:
+        lines.extend(_replica_gauges(router))
+    lines.extend(_circuit_gauges(breakers))
+    return "\n".join(lines) + "\n"
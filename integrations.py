@@ -1,165 +1,584 @@
 import os
-import requests
+import json
+import random
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import httpx
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 from typing import Optional
+from starlette.concurrency import run_in_threadpool
+
+from mockdata import WEATHER_CITIES, generate, to_records
+from instrumentation import observe_outbound, observe_fetch, observe_retry, observe_fallback
+from tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
 
 STRIPE_API_KEY = os.environ.get("STRIPE_API_KEY", "")
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN", "")
 OPENWEATHER_API_KEY = os.environ.get("OPENWEATHER_API_KEY", "")
 
-def fetch_stripe_payments(limit: int = 25):
+STRIPE_API_BASE = os.environ.get("STRIPE_API_BASE", "https://api.stripe.com")
+GITHUB_API_BASE = os.environ.get("GITHUB_API_BASE", "https://api.github.com")
+OPENWEATHER_API_BASE = os.environ.get("OPENWEATHER_API_BASE", "https://api.openweathermap.org")
+
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_PER_HOST_CONCURRENCY = int(os.environ.get("HTTP_PER_HOST_CONCURRENCY", "5"))
+HTTP_REQUEST_TIMEOUT = float(os.environ.get("HTTP_REQUEST_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3"))
+FETCH_DEADLINE = float(os.environ.get("FETCH_DEADLINE", "15"))
+
+# Retries per request for 429, 5xx and connection errors, with exponential backoff and jitter.
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.environ.get("HTTP_RETRY_BACKOFF", "0.25"))
+# Longest Retry-After or rate-limit reset worth sleeping through; anything longer fails fast.
+HTTP_MAX_RETRY_WAIT = float(os.environ.get("HTTP_MAX_RETRY_WAIT", "5"))
+# Below this many remaining requests, calls are spread over what is left of the rate-limit window.
+HTTP_RATE_LIMIT_RESERVE = int(os.environ.get("HTTP_RATE_LIMIT_RESERVE", "10"))
+# Consecutive failed calls that open an integration's circuit, and seconds it stays open before one probe call.
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get("CIRCUIT_RESET_TIMEOUT", "30"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+STREAM_PAGE_SIZE = 100
+MOCK_BACKFILL_SIZE = int(os.environ.get("MOCK_BACKFILL_SIZE", "500"))
+
+# Seconds a fetched result is reused for the same source and parameters, e.g. FETCH_CACHE_TTL_WEATHER=600.
+# 0 still coalesces concurrent identical fetches but never serves a finished one again.
+FETCH_CACHE_TTL = float(os.environ.get("FETCH_CACHE_TTL", "30"))
+FETCH_CACHE_TTLS = {
+    source: float(os.environ.get(f"FETCH_CACHE_TTL_{source.upper()}", FETCH_CACHE_TTL))
+    for source in ("stripe", "github", "weather")
+}
+# SQLite file shared by every worker process on the host; unset keeps the cache in process memory.
+FETCH_CACHE_PATH = os.environ.get("FETCH_CACHE_PATH", "")
+FETCH_CACHE_POLL_INTERVAL = float(os.environ.get("FETCH_CACHE_POLL_INTERVAL", "0.1"))
+
+class IntegrationUnavailable(Exception):
+    def __init__(self, integration: str, reason: str):
+        super().__init__(f"{integration} unavailable: {reason}")
+        self.integration = integration
+        self.reason = reason
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self._probing:
+            return False
+        # Half-open: let a single call through to find out whether the upstream is back.
+        self._probing = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+def _retry_after(response: httpx.Response):
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class RateLimit:
+    def __init__(self):
+        self.resume_at = 0.0
+
+    def wait(self):
+        return max(self.resume_at - time.monotonic(), 0.0)
+
+    def update(self, response: httpx.Response):
+        now = time.monotonic()
+        retry_after = _retry_after(response)
+        if retry_after is not None and response.status_code in (429, 503):
+            self.resume_at = max(self.resume_at, now + retry_after)
+            return
+        try:
+            remaining = int(response.headers["X-RateLimit-Remaining"])
+            window = max(float(response.headers["X-RateLimit-Reset"]) - time.time(), 0.0)
+        except (KeyError, ValueError):
+            return
+        if remaining <= 0:
+            self.resume_at = max(self.resume_at, now + window)
+        elif remaining <= HTTP_RATE_LIMIT_RESERVE:
+            self.resume_at = max(self.resume_at, now + window / remaining)
+
+class IntegrationClient:
+    def __init__(self, max_connections: int = HTTP_MAX_CONNECTIONS, per_host_concurrency: int = HTTP_PER_HOST_CONCURRENCY, timeout: float = HTTP_REQUEST_TIMEOUT, max_retries: int = HTTP_MAX_RETRIES):
+        self.max_connections = max_connections
+        self.per_host_concurrency = per_host_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client = None
+        self._host_limits = {}
+        self.breakers = {}
+        self.rate_limits = {}
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                timeout=httpx.Timeout(self.timeout, connect=min(HTTP_CONNECT_TIMEOUT, self.timeout)),
+            )
+            self._host_limits = {}
+        return self._client
+
+    async def _send(self, url: str, integration: str, **kwargs):
+        client = self._get_client()
+        host = httpx.URL(url).host
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host_concurrency)
+        async with limit:
+            started = time.perf_counter()
+            try:
+                response = await client.get(url, **kwargs)
+            except Exception as e:
+                observe_outbound(integration, type(e).__name__, time.perf_counter() - started)
+                raise
+            observe_outbound(integration, response.status_code, time.perf_counter() - started)
+            return response
+
+    async def get(self, url: str, integration: str = "other", **kwargs):
+        breaker = self.breakers.setdefault(integration, CircuitBreaker())
+        rate_limit = self.rate_limits.setdefault(integration, RateLimit())
+        if rate_limit.wait() > HTTP_MAX_RETRY_WAIT:
+            raise IntegrationUnavailable(integration, "rate_limited")
+        if not breaker.allow():
+            raise IntegrationUnavailable(integration, "circuit_open")
+        try:
+            response = await self._get_with_retries(url, integration, rate_limit, **kwargs)
+        except BaseException:
+            # Any exception counts, so a half-open probe always settles the breaker. Cancellation means
+            # the caller's deadline ran out, usually on a hung upstream.
+            breaker.record_failure()
+            raise
+        # A 429 still proves the upstream is up; RateLimit does the backing off.
+        if response.status_code in RETRY_STATUSES and response.status_code != 429:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    async def _get_with_retries(self, url: str, integration: str, rate_limit: RateLimit, **kwargs):
+        attempt = 0
+        while True:
+            wait = rate_limit.wait()
+            if wait:
+                await asyncio.sleep(min(wait, HTTP_MAX_RETRY_WAIT))
+            try:
+                response = await self._send(url, integration, **kwargs)
+            except httpx.ReadTimeout:
+                # A hung upstream rarely answers a second time; fail now rather than wait again.
+                raise
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                reason, delay = type(e).__name__, None
+            else:
+                rate_limit.update(response)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                reason, delay = str(response.status_code), _retry_after(response)
+                if attempt >= self.max_retries or (delay or 0) > HTTP_MAX_RETRY_WAIT:
+                    return response
+            if delay is None:
+                delay = HTTP_RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+            attempt += 1
+            observe_retry(integration, reason)
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+http_client = IntegrationClient()
+
+class FetchStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fetch_cache "
+                "(key TEXT PRIMARY KEY, tenant TEXT, value TEXT, expires_at REAL, lease_until REAL)"
+            )
+            if "tenant" not in {row[1] for row in conn.execute("PRAGMA table_info(fetch_cache)")}:
+                # Files written before results were tenant-keyed; their old keys are never looked up again and expire.
+                conn.execute("ALTER TABLE fetch_cache ADD COLUMN tenant TEXT")
+        return conn
+
+    def claim(self, tenant: str, key: str, lease: float):
+        # (result, False) on a hit, (None, True) when this process should fetch, (None, False) while another one is.
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value, expires_at, lease_until FROM fetch_cache WHERE key = ?", (key,)).fetchone()
+            if row and row[0] is not None and row[1] > now:
+                return json.loads(row[0]), False
+            if row and row[2] is not None and row[2] > now:
+                return None, False
+            conn.execute(
+                "INSERT INTO fetch_cache (key, tenant, lease_until) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET lease_until = excluded.lease_until",
+                (key, tenant, now + lease)
+            )
+            return None, True
+        finally:
+            conn.execute("COMMIT")
+
+    def put(self, tenant: str, key: str, result: dict, ttl: float):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO fetch_cache (key, tenant, value, expires_at, lease_until) VALUES (?, ?, ?, ?, NULL) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at, lease_until = NULL",
+            (key, tenant, json.dumps(result), now + ttl)
+        )
+        conn.execute("DELETE FROM fetch_cache WHERE expires_at < ? AND (lease_until IS NULL OR lease_until < ?)", (now, now))
+
+    def release(self, key: str):
+        self._connect().execute("UPDATE fetch_cache SET lease_until = NULL WHERE key = ?", (key,))
+
+class FetchCache:
+    def __init__(self, ttls: dict = FETCH_CACHE_TTLS, path: str = FETCH_CACHE_PATH, lease: float = FETCH_DEADLINE + 5):
+        self.ttls = ttls
+        self.lease = lease
+        self.store = FetchStore(path) if path else None
+        self._entries = {}
+        self._inflight = {}
+
+    async def fetch(self, source: str, params: dict, fetch):
+        # Tenants may sync with their own credentials, so neither results nor in-flight fetches are shared across them.
+        tenant = current_tenant.get()
+        key = f"{tenant}:{source}:{json.dumps(params, sort_keys=True)}"
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._resolve(tenant, source, key, fetch))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            observe_fetch(source, "coalesced")
+        # Shielded so a caller that goes away does not cancel the fetch everyone else is waiting on.
+        return await asyncio.shield(task)
+
+    async def _resolve(self, tenant: str, source: str, key: str, fetch):
+        ttl = self.ttls.get(source, 0)
+        if ttl <= 0:
+            observe_fetch(source, "miss")
+            return await fetch()
+        if self.store is None:
+            return await self._resolve_local(source, key, fetch, ttl)
+        
+        deadline = time.monotonic() + self.lease
+        waited = False
+        while True:
+            cached, owner = await run_in_threadpool(self.store.claim, tenant, key, self.lease)
+            if cached is not None:
+                observe_fetch(source, "coalesced" if waited else "hit")
+                return cached
+            if owner or time.monotonic() > deadline:
+                break
+            # Another worker process holds the lease; its result lands in the store when it finishes.
+            waited = True
+            await asyncio.sleep(FETCH_CACHE_POLL_INTERVAL)
+        
+        observe_fetch(source, "miss")
+        try:
+            result = await fetch()
+        except BaseException:
+            await run_in_threadpool(self.store.release, key)
+            raise
+        if result.get("fallback") or result.get("partial"):
+            await run_in_threadpool(self.store.release, key)
+        else:
+            await run_in_threadpool(self.store.put, tenant, key, result, ttl)
+        return result
+
+    async def _resolve_local(self, source: str, key: str, fetch, ttl: float):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            observe_fetch(source, "hit")
+            return entry[1]
+        observe_fetch(source, "miss")
+        result = await fetch()
+        if result.get("fallback") or result.get("partial"):
+            # Mock or incomplete data standing in for a failed upstream is not worth keeping; the next sync tries again.
+            return result
+        now = time.monotonic()
+        self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+        self._entries[key] = (now + ttl, result)
+        return result
+
+fetch_cache = FetchCache()
+
+def _failure_reason(error: BaseException):
+    if isinstance(error, IntegrationUnavailable):
+        return error.reason
+    if isinstance(error, (TimeoutError, httpx.TimeoutException)):
+        return "timeout"
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"http_{error.response.status_code}"
+    return type(error).__name__
+
+def _fallback(mock: dict, integration: str, reason: str):
+    # Live credentials are configured but the call failed: the sync still completes, flagged as mock data.
+    logger.warning("%s unavailable (%s); syncing mock data instead", integration, reason)
+    observe_fallback(integration, reason)
+    return {**mock, "fallback": reason}
+
+def _partial(result: dict, integration: str, failed: list, reason: str):
+    # Some live calls succeeded: keep what arrived, but say which parts are missing and why.
+    logger.warning("%s partially unavailable (%s); missing %s", integration, reason, ", ".join(failed))
+    observe_fallback(integration, reason)
+    return {**result, "partial": True, "partial_reason": reason, "failed_cities": failed}
+
+async def fetch_stripe_payments(limit: int = 25, created_after: int = None):
+    return await fetch_cache.fetch(
+        "stripe", {"limit": limit, "created_after": created_after},
+        lambda: _fetch_stripe_payments(limit, created_after)
+    )
+
+async def _fetch_stripe_payments(limit: int = 25, created_after: int = None):
     if not STRIPE_API_KEY:
         return generate_mock_stripe_payments(limit)
     
     try:
-        response = requests.get(
-            "https://api.stripe.com/v1/charges",
-            params={"limit": limit},
-            auth=(STRIPE_API_KEY, ""),
-            timeout=10
-        )
+        if created_after is not None:
+            payments = []
+            async with asyncio.timeout(FETCH_DEADLINE):
+                async for page, _ in iter_stripe_payments(created_after=created_after):
+                    payments.extend(page)
+            return {"data": payments, "source": "stripe_live", "live": True, "success": True}
+        
+        async with asyncio.timeout(FETCH_DEADLINE):
+            response = await http_client.get(
+                f"{STRIPE_API_BASE}/v1/charges",
+                integration="stripe",
+                params={"limit": limit},
+                auth=(STRIPE_API_KEY, "")
+            )
         if response.status_code == 200:
             data = response.json()
-            payments = []
-            for charge in data.get("data", []):
-                payments.append({
-                    "payment_id": charge["id"],
-                    "amount": charge["amount"] / 100,
-                    "currency": charge.get("currency", "usd").upper(),
-                    "status": charge.get("status", "unknown"),
-                    "customer_email": charge.get("billing_details", {}).get("email", "N/A"),
-                    "description": charge.get("description", "No description"),
-                    "created_at": datetime.fromtimestamp(charge["created"]).isoformat()
-                })
-            return {"data": payments, "source": "stripe_live", "success": True}
-        else:
-            return generate_mock_stripe_payments(limit)
+            payments = [parse_stripe_charge(charge) for charge in data.get("data", [])]
+            return {"data": payments, "source": "stripe_live", "live": True, "success": True}
+        return _fallback(generate_mock_stripe_payments(limit), "stripe", f"http_{response.status_code}")
     except Exception as e:
-        return generate_mock_stripe_payments(limit)
+        return _fallback(generate_mock_stripe_payments(limit), "stripe", _failure_reason(e))
 
-def generate_mock_stripe_payments(count: int = 25):
-    import random
-    payments = []
-    statuses = ["succeeded", "pending", "failed"]
-    weights = [0.8, 0.15, 0.05]
-    emails = ["customer@example.com", "buyer@company.com", "user@business.org", "client@startup.io"]
+def parse_stripe_charge(charge: dict):
+    return {
+        "payment_id": charge["id"],
+        "amount": charge["amount"] / 100,
+        "currency": charge.get("currency", "usd").upper(),
+        "status": charge.get("status", "unknown"),
+        "customer_email": charge.get("billing_details", {}).get("email", "N/A"),
+        "description": charge.get("description", "No description"),
+        "created_at": datetime.fromtimestamp(charge["created"]).isoformat(),
+        "created": charge["created"]
+    }
+
+async def iter_stripe_payments(starting_after: str = None, page_size: int = STREAM_PAGE_SIZE, created_after: int = None):
+    if not STRIPE_API_KEY:
+        start = int(starting_after.rsplit("_", 1)[1]) - 100000 + 1 if starting_after else 0
+        while start < MOCK_BACKFILL_SIZE:
+            payments = generate_mock_stripe_payments(min(page_size, MOCK_BACKFILL_SIZE - start), start=start)["data"]
+            start += len(payments)
+            yield payments, payments[-1]["payment_id"]
+        return
     
-    for i in range(count):
-        payments.append({
-            "payment_id": f"ch_mock_{100000 + i}",
-            "amount": round(random.uniform(10, 500), 2),
-            "currency": "USD",
-            "status": random.choices(statuses, weights=weights)[0],
-            "customer_email": random.choice(emails),
-            "description": f"Payment for order #{random.randint(1000, 9999)}",
-            "created_at": datetime.utcnow().isoformat()
-        })
-    return {"data": payments, "source": "stripe_mock", "success": True}
-
-def fetch_github_issues(repo: str = "facebook/react", limit: int = 25):
+    while True:
+        params = {"limit": page_size}
+        if created_after is not None:
+            params["created[gt]"] = created_after
+        if starting_after:
+            params["starting_after"] = starting_after
+        response = await http_client.get(
+            f"{STRIPE_API_BASE}/v1/charges",
+            integration="stripe",
+            params=params,
+            auth=(STRIPE_API_KEY, "")
+        )
+        response.raise_for_status()
+        data = response.json()
+        charges = data.get("data", [])
+        if not charges:
+            return
+        starting_after = charges[-1]["id"]
+        yield [parse_stripe_charge(charge) for charge in charges], starting_after
+        if not data.get("has_more"):
+            return
+
+def generate_mock_stripe_payments(count: int = 25, start: int = 0, seed: int = None):
+    payments = to_records(generate("stripe_payments", count, seed=seed, start=start))
+    return {"data": payments, "source": "stripe_mock", "live": False, "success": True}
+
+async def fetch_github_issues(repo: str = "facebook/react", limit: int = 25, since: str = None, etag: str = None):
+    return await fetch_cache.fetch(
+        "github", {"repo": repo, "limit": limit, "since": since, "etag": etag},
+        lambda: _fetch_github_issues(repo, limit, since, etag)
+    )
+
+async def _fetch_github_issues(repo: str = "facebook/react", limit: int = 25, since: str = None, etag: str = None):
     if not GITHUB_TOKEN:
         return generate_mock_github_issues(limit)
     
     try:
         headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-        response = requests.get(
-            f"https://api.github.com/repos/{repo}/issues",
-            params={"per_page": limit, "state": "all"},
-            headers=headers,
-            timeout=10
-        )
-        if response.status_code == 200:
-            data = response.json()
-            issues = []
-            for issue in data:
-                issues.append({
-                    "issue_id": issue["id"],
-                    "title": issue["title"][:200],
-                    "state": issue["state"],
-                    "author": issue["user"]["login"],
-                    "repository": repo,
-                    "labels": ",".join([l["name"] for l in issue.get("labels", [])]),
-                    "created_at": issue["created_at"]
-                })
-            return {"data": issues, "source": "github_live", "success": True}
-        else:
-            return generate_mock_github_issues(limit)
+        params = {"per_page": limit, "state": "all"}
+        if since:
+            params.update({"per_page": STREAM_PAGE_SIZE, "since": since})
+        async with asyncio.timeout(FETCH_DEADLINE):
+            response = await http_client.get(
+                f"{GITHUB_API_BASE}/repos/{repo}/issues",
+                integration="github",
+                params=params,
+                headers={**headers, "If-None-Match": etag} if etag else headers
+            )
+            if response.status_code == 304:
+                return {"data": [], "source": "github_live", "live": True, "success": True, "not_modified": True, "etag": etag}
+            if response.status_code == 200:
+                issues = [parse_github_issue(issue, repo) for issue in response.json()]
+                next_url = response.links.get("next", {}).get("url") if since else None
+                if next_url:
+                    async for page, _ in iter_github_issues(repo, next_url=next_url):
+                        issues.extend(page)
+                return {"data": issues, "source": "github_live", "live": True, "success": True, "etag": response.headers.get("ETag")}
+        return _fallback(generate_mock_github_issues(limit), "github", f"http_{response.status_code}")
     except Exception as e:
-        return generate_mock_github_issues(limit)
+        return _fallback(generate_mock_github_issues(limit), "github", _failure_reason(e))
+
+def parse_github_issue(issue: dict, repo: str):
+    return {
+        "issue_id": issue["id"],
+        "title": issue["title"][:200],
+        "state": issue["state"],
+        "author": issue["user"]["login"],
+        "repository": repo,
+        "labels": ",".join([l["name"] for l in issue.get("labels", [])]),
+        "label_names": [l["name"] for l in issue.get("labels", [])],
+        "created_at": issue["created_at"],
+        "updated_at": issue.get("updated_at", issue["created_at"])
+    }
 
-def generate_mock_github_issues(count: int = 25):
-    import random
-    issues = []
-    titles = [
-        "Bug: Component not rendering correctly",
-        "Feature request: Add dark mode support",
-        "Performance issue with large datasets",
-        "Documentation update needed",
-        "Refactor: Improve code organization",
-        "Fix: Memory leak in event handler",
-        "Add unit tests for new module",
-        "Update dependencies to latest versions"
-    ]
-    authors = ["developer1", "contributor42", "maintainer", "user123", "coder99"]
-    repos = ["facebook/react", "vercel/next.js", "microsoft/vscode"]
+async def iter_github_issues(repo: str = "facebook/react", next_url: str = None, page_size: int = STREAM_PAGE_SIZE):
+    if not GITHUB_TOKEN:
+        start = int(next_url) if next_url else 0
+        while start < MOCK_BACKFILL_SIZE:
+            issues = generate_mock_github_issues(min(page_size, MOCK_BACKFILL_SIZE - start), start=start)["data"]
+            start += len(issues)
+            yield issues, str(start)
+        return
     
-    for i in range(count):
-        issues.append({
-            "issue_id": 50000 + i,
-            "title": random.choice(titles) + f" #{i+1}",
-            "state": random.choice(["open", "closed"]),
-            "author": random.choice(authors),
-            "repository": random.choice(repos),
-            "labels": random.choice(["bug", "enhancement", "documentation", "help wanted"]),
-            "created_at": datetime.utcnow().isoformat()
-        })
-    return {"data": issues, "source": "github_mock", "success": True}
-
-def fetch_weather_data(cities: list = None):
+    headers = {"Authorization": f"token {GITHUB_TOKEN}"}
+    url = next_url or f"{GITHUB_API_BASE}/repos/{repo}/issues"
+    params = None if next_url else {"per_page": page_size, "state": "all"}
+    while url:
+        response = await http_client.get(url, integration="github", params=params, headers=headers)
+        response.raise_for_status()
+        # The Link header's next URL already carries every query parameter.
+        url = response.links.get("next", {}).get("url")
+        params = None
+        yield [parse_github_issue(issue, repo) for issue in response.json()], url
+
+def generate_mock_github_issues(count: int = 25, start: int = 0, seed: int = None):
+    issues = to_records(generate("github_issues", count, seed=seed, start=start))
+    return {"data": issues, "source": "github_mock", "live": False, "success": True}
+
+async def _fetch_city_weather(city: str):
+    return await http_client.get(
+        f"{OPENWEATHER_API_BASE}/data/2.5/weather",
+        integration="openweather",
+        params={"q": city, "appid": OPENWEATHER_API_KEY, "units": "metric"}
+    )
+
+async def fetch_weather_data(cities: list = None):
     if cities is None:
-        cities = ["London", "New York", "Tokyo", "Sydney", "Paris"]
-    
+        cities = WEATHER_CITIES
+    return await fetch_cache.fetch("weather", {"cities": sorted(cities)}, lambda: _fetch_weather_data(cities))
+
+async def _fetch_weather_data(cities: list):
     if not OPENWEATHER_API_KEY:
         return generate_mock_weather_data(cities)
     
     try:
-        weather_data = []
-        for city in cities:
-            response = requests.get(
-                "https://api.openweathermap.org/data/2.5/weather",
-                params={"q": city, "appid": OPENWEATHER_API_KEY, "units": "metric"},
-                timeout=10
+        async with asyncio.timeout(FETCH_DEADLINE):
+            responses = await asyncio.gather(
+                *(_fetch_city_weather(city) for city in cities),
+                return_exceptions=True
             )
-            if response.status_code == 200:
-                data = response.json()
-                weather_data.append({
-                    "city": city,
-                    "temperature": data["main"]["temp"],
-                    "feels_like": data["main"]["feels_like"],
-                    "humidity": data["main"]["humidity"],
-                    "description": data["weather"][0]["description"],
-                    "wind_speed": data["wind"]["speed"],
-                    "recorded_at": datetime.utcnow().isoformat()
-                })
+        weather_data = []
+        failed = []
+        reason = None
+        for city, response in zip(cities, responses):
+            if isinstance(response, BaseException):
+                reason = reason or _failure_reason(response)
+                failed.append(city)
+                continue
+            if response.status_code != 200:
+                reason = reason or f"http_{response.status_code}"
+                failed.append(city)
+                continue
+            data = response.json()
+            weather_data.append({
+                "city": city,
+                "temperature": data["main"]["temp"],
+                "feels_like": data["main"]["feels_like"],
+                "humidity": data["main"]["humidity"],
+                "description": data["weather"][0]["description"],
+                "wind_speed": data["wind"]["speed"],
+                "recorded_at": datetime.utcnow().isoformat()
+            })
+        if weather_data and failed:
+            return _partial({"data": weather_data, "source": "openweather_live", "live": True, "success": True}, "openweather", failed, reason)
         if weather_data:
-            return {"data": weather_data, "source": "openweather_live", "success": True}
-        return generate_mock_weather_data(cities)
+            return {"data": weather_data, "source": "openweather_live", "live": True, "success": True}
+        return _fallback(generate_mock_weather_data(cities), "openweather", reason or "no_data")
     except Exception as e:
-        return generate_mock_weather_data(cities)
+        return _fallback(generate_mock_weather_data(cities), "openweather", _failure_reason(e))
 
-def generate_mock_weather_data(cities: list):
-    import random
-    weather_data = []
-    descriptions = ["clear sky", "few clouds", "scattered clouds", "light rain", "sunny", "overcast"]
-    
-    for city in cities:
-        weather_data.append({
-            "city": city,
-            "temperature": round(random.uniform(-5, 35), 1),
-            "feels_like": round(random.uniform(-8, 38), 1),
-            "humidity": random.randint(30, 90),
-            "description": random.choice(descriptions),
-            "wind_speed": round(random.uniform(0, 20), 1),
-            "recorded_at": datetime.utcnow().isoformat()
-        })
-    return {"data": weather_data, "source": "openweather_mock", "success": True}
+def generate_mock_weather_data(cities: list, seed: int = None):
+    weather_data = to_records(generate("weather", len(cities), seed=seed, distributions={"city": cities}))
+    return {"data": weather_data, "source": "openweather_mock", "live": False, "success": True}
@@ -0,0 +1,274 @@
+import os
+import json
+import uuid
+import socket
+import random
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_
+from sqlalchemy.orm import Session
+
+from database import run_db, open_db
+from models import SyncJob, SyncState
+from pipeline import SYNC_RUNNERS, get_sync_state, run_sync
+from tenancy import TENANTS, current_tenant, tenant_scope
+
+logger = logging.getLogger(__name__)
+
+SYNC_WORKERS = int(os.environ.get("SYNC_WORKERS", "2"))
+SYNC_POLL_INTERVAL = float(os.environ.get("SYNC_POLL_INTERVAL", "1"))
+SYNC_JOB_LEASE = int(os.environ.get("SYNC_JOB_LEASE", "60"))
+SYNC_JOB_MAX_ATTEMPTS = int(os.environ.get("SYNC_JOB_MAX_ATTEMPTS", "3"))
+SYNC_JITTER = float(os.environ.get("SYNC_JITTER", "0.1"))
+
+# Per-source schedule in seconds, e.g. SYNC_INTERVAL_STRIPE=300; 0 disables scheduled runs.
+SYNC_INTERVALS = {
+    source: float(os.environ.get(f"SYNC_INTERVAL_{source.upper()}", "0"))
+    for source in SYNC_RUNNERS
+}
+
+ACTIVE_STATUSES = ("queued", "running")
+
+def job_to_dict(job: SyncJob):
+    return {
+        "id": job.id,
+        "tenant_id": job.tenant_id,
+        "source": job.source,
+        "params": json.loads(job.params) if job.params else {},
+        "status": job.status,
+        "attempts": job.attempts,
+        "requested_by": job.requested_by,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+def enqueue(db: Session, source: str, params: dict = None, requested_by: str = None):
+    params_json = json.dumps(params or {}, sort_keys=True)
+    existing = db.execute(
+        select(SyncJob)
+        .where(
+            SyncJob.tenant_id == current_tenant.get(),
+            SyncJob.source == source,
+            SyncJob.params == params_json,
+            SyncJob.status.in_(ACTIVE_STATUSES)
+        )
+        .order_by(SyncJob.id)
+        .limit(1)
+    ).scalar()
+    if existing is not None:
+        return existing, False
+
+    job = SyncJob(source=source, params=params_json, status="queued", requested_by=requested_by, attempts=0)
+    db.add(job)
+    db.commit()
+    job_queue.notify()
+    return job, True
+
+def enqueue_if_due(db: Session, source: str, interval: float):
+    cutoff = datetime.utcnow() - timedelta(seconds=interval)
+    recent = db.execute(
+        select(SyncJob.id)
+        .where(
+            SyncJob.tenant_id == current_tenant.get(),
+            SyncJob.source == source,
+            SyncJob.params == "{}",
+            SyncJob.created_at > cutoff
+        )
+        .limit(1)
+    ).scalar()
+    if recent is not None:
+        return None
+    job, _ = enqueue(db, source, requested_by="scheduler")
+    return job
+
+def _acquire_source_lock(db: Session, source: str, job_id: int, now: datetime):
+    get_sync_state(db, source)
+    result = db.execute(
+        update(SyncState)
+        .where(
+            SyncState.source == source,
+            or_(SyncState.lock_job_id.is_(None), SyncState.lock_job_id == job_id, SyncState.lock_expires_at < now)
+        )
+        .values(lock_job_id=job_id, lock_expires_at=now + timedelta(seconds=SYNC_JOB_LEASE))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def _release_source_lock(db: Session, source: str, job_id: int):
+    db.execute(
+        update(SyncState)
+        .where(SyncState.source == source, SyncState.lock_job_id == job_id)
+        .values(lock_job_id=None, lock_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+
+def claim_next(db: Session, worker_id: str):
+    now = datetime.utcnow()
+    candidates = db.execute(
+        select(SyncJob.id, SyncJob.tenant_id, SyncJob.source)
+        .where(
+            or_(
+                SyncJob.status == "queued",
+                # A running job whose lease lapsed belongs to a worker that died.
+                (SyncJob.status == "running") & (SyncJob.lease_expires_at < now)
+            ),
+            SyncJob.run_after <= now
+        )
+        .order_by(SyncJob.id)
+        .limit(10)
+    ).all()
+
+    for job_id, tenant, source in candidates:
+        # The per-tenant, per-source lock row gives single-flight across workers and processes.
+        with tenant_scope(tenant):
+            acquired = _acquire_source_lock(db, source, job_id, now)
+        if not acquired:
+            db.rollback()
+            continue
+        claimed = db.execute(
+            update(SyncJob)
+            .where(
+                SyncJob.id == job_id,
+                or_(SyncJob.status == "queued", (SyncJob.status == "running") & (SyncJob.lease_expires_at < now))
+            )
+            .values(
+                status="running",
+                locked_by=worker_id,
+                lease_expires_at=now + timedelta(seconds=SYNC_JOB_LEASE),
+                attempts=SyncJob.attempts + 1,
+                started_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if claimed.rowcount != 1:
+            db.rollback()
+            continue
+        db.commit()
+        return db.get(SyncJob, job_id)
+    return None
+
+def _renew_lease(db: Session, job_id: int, source: str):
+    expires = datetime.utcnow() + timedelta(seconds=SYNC_JOB_LEASE)
+    db.execute(update(SyncJob).where(SyncJob.id == job_id).values(lease_expires_at=expires))
+    db.execute(
+        update(SyncState)
+        .where(SyncState.source == source, SyncState.lock_job_id == job_id)
+        .values(lock_expires_at=expires)
+    )
+    db.commit()
+
+async def _keep_lease(job_id: int, source: str):
+    while True:
+        await asyncio.sleep(SYNC_JOB_LEASE / 3)
+        await run_db(_renew_lease, job_id, source)
+
+def _finish(db: Session, job_id: int, source: str, status: str, result: dict = None, error: str = None, retry: bool = False):
+    job = db.get(SyncJob, job_id)
+    now = datetime.utcnow()
+    if retry:
+        job.status = "queued"
+        job.run_after = now + timedelta(seconds=2 ** job.attempts)
+    else:
+        job.status = status
+        job.finished_at = now
+    job.result = json.dumps(result) if result is not None else None
+    job.error = error
+    job.lease_expires_at = None
+    _release_source_lock(db, source, job_id)
+    db.commit()
+
+async def _run_job(source: str, params: dict, requested_by: str):
+    db = await open_db()
+    try:
+        return await run_sync(db, source, params, requested_by=requested_by)
+    finally:
+        await db.close()
+
+async def execute_job(job: SyncJob):
+    job_id, source, attempts = job.id, job.source, job.attempts
+    params = json.loads(job.params) if job.params else {}
+    with tenant_scope(job.tenant_id):
+        lease = asyncio.create_task(_keep_lease(job_id, source))
+        try:
+            result = await _run_job(source, params, job.requested_by)
+        except Exception as e:
+            logger.exception("Sync job %s for %s/%s failed", job_id, job.tenant_id, source)
+            await run_db(_finish, job_id, source, "failed", error=str(e), retry=attempts < SYNC_JOB_MAX_ATTEMPTS)
+        else:
+            await run_db(_finish, job_id, source, "succeeded", result=result)
+        finally:
+            lease.cancel()
+    job_queue.notify()
+
+class JobQueue:
+    def __init__(self):
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._wakeup = None
+        self._loop = None
+        self._tasks = []
+
+    def notify(self):
+        # Called from worker threads as well as the event loop.
+        if self._wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _wait(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _worker(self, index: int):
+        worker_id = f"{self.worker_prefix}:{index}"
+        while True:
+            try:
+                job = await run_db(claim_next, worker_id)
+                if job is not None:
+                    await execute_job(job)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Sync worker %s crashed while polling", worker_id)
+            await self._wait(SYNC_POLL_INTERVAL)
+
+    async def _scheduler(self):
+        due = {
+            source: asyncio.get_running_loop().time() + interval * random.uniform(0, SYNC_JITTER)
+            for source, interval in SYNC_INTERVALS.items()
+            if interval > 0
+        }
+        while due:
+            now = asyncio.get_running_loop().time()
+            for source, at in due.items():
+                if at > now:
+                    continue
+                interval = SYNC_INTERVALS[source]
+                for tenant in TENANTS:
+                    try:
+                        with tenant_scope(tenant):
+                            await run_db(enqueue_if_due, source, interval)
+                    except Exception:
+                        logger.exception("Scheduler failed to enqueue %s for %s", source, tenant)
+                due[source] = now + interval * (1 + random.uniform(-SYNC_JITTER, SYNC_JITTER))
+            await asyncio.sleep(max(0.1, min(due.values()) - asyncio.get_running_loop().time()))
+
+    def start(self, workers: int = SYNC_WORKERS):
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(workers)]
+        self._tasks.append(asyncio.create_task(self._scheduler()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+job_queue = JobQueue()
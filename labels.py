@@ -0,0 +1,191 @@
+import sys
+import argparse
+from collections import defaultdict
+from sqlalchemy import select, delete, update, insert, func, and_
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, engine, Base
+from models import GitHubIssue, Label, IssueLabel
+from ingest import dialect_insert, chunks, LOOKUP_CHUNK_SIZE
+from tenancy import tenant_scope, tenant_ids
+
+REBUILD_CHUNK_SIZE = 5000
+
+def label_names(record: dict):
+    # Live issues carry the label list; mock and stored rows only have the comma-joined display string.
+    names = record.get("label_names")
+    if names is None:
+        names = (record.get("labels") or "").split(",")
+    return sorted({name.strip() for name in names if name and name.strip()})
+
+def _insert_ignoring_conflicts(db: Session, model, index_elements: list, rows: list):
+    stmt = dialect_insert(db, model)
+    if stmt is not None:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+    else:
+        stmt = insert(model)
+    db.execute(stmt, rows)
+
+def intern_labels(db: Session, names: set):
+    ids = {}
+    for chunk in chunks(sorted(names), LOOKUP_CHUNK_SIZE):
+        ids.update(db.execute(select(Label.name, Label.id).where(Label.name.in_(chunk))).all())
+    missing = sorted(name for name in names if name not in ids)
+    if missing:
+        # A concurrent sync may intern the same name first; either way the lookup below sees one row.
+        _insert_ignoring_conflicts(db, Label, ["tenant_id", "name"], [{"name": name} for name in missing])
+        for chunk in chunks(missing, LOOKUP_CHUNK_SIZE):
+            ids.update(db.execute(select(Label.name, Label.id).where(Label.name.in_(chunk))).all())
+    return ids
+
+def _wanted_rows(db: Session, issues: dict):
+    # issues: github_issues.id -> (created_at, state, label names)
+    ids = intern_labels(db, {name for _, _, names in issues.values() for name in names})
+    return {
+        (issue_id, ids[name]): {"issue_id": issue_id, "label_id": ids[name], "state": state, "created_at": created_at}
+        for issue_id, (created_at, state, names) in issues.items()
+        for name in names
+    }
+
+def apply_issue_labels(db: Session, records: list):
+    desired = {}
+    for record in records:
+        desired[record["issue_id"]] = (record.get("state"), label_names(record))
+    if not desired:
+        return {"added": 0, "removed": 0, "updated": 0}
+
+    issues = {}
+    for chunk in chunks(list(desired), LOOKUP_CHUNK_SIZE):
+        rows = db.execute(
+            select(GitHubIssue.id, GitHubIssue.issue_id, GitHubIssue.created_at).where(GitHubIssue.issue_id.in_(chunk))
+        )
+        for row_id, external_id, created_at in rows:
+            issues[row_id] = (created_at, *desired[external_id])
+    wanted = _wanted_rows(db, issues)
+
+    existing = {}
+    for chunk in chunks(list(issues), LOOKUP_CHUNK_SIZE):
+        rows = db.execute(
+            select(IssueLabel.id, IssueLabel.issue_id, IssueLabel.label_id, IssueLabel.state)
+            .where(IssueLabel.issue_id.in_(chunk))
+        )
+        for row_id, issue_id, label_id, state in rows:
+            existing[(issue_id, label_id)] = (row_id, state)
+
+    removed = [row_id for key, (row_id, _) in existing.items() if key not in wanted]
+    added = [row for key, row in wanted.items() if key not in existing]
+    moved = defaultdict(list)
+    for key, row in wanted.items():
+        current = existing.get(key)
+        if current is not None and current[1] != row["state"]:
+            moved[row["state"]].append(current[0])
+
+    # The row ids came from a tenant-scoped read; repeating the tenant predicate would steer SQLite off the primary key.
+    by_id = {"synchronize_session": False, "all_tenants": True}
+    for chunk in chunks(removed, LOOKUP_CHUNK_SIZE):
+        db.execute(delete(IssueLabel).where(IssueLabel.id.in_(chunk)), execution_options=by_id)
+    for state, row_ids in moved.items():
+        for chunk in chunks(row_ids, LOOKUP_CHUNK_SIZE):
+            db.execute(update(IssueLabel).where(IssueLabel.id.in_(chunk)).values(state=state), execution_options=by_id)
+    if added:
+        _insert_ignoring_conflicts(db, IssueLabel, ["tenant_id", "issue_id", "label_id"], added)
+    return {"added": len(added), "removed": len(removed), "updated": sum(len(row_ids) for row_ids in moved.values())}
+
+def label_id(db: Session, name: str):
+    return db.execute(select(Label.id).where(Label.name == name)).scalar()
+
+def issues_with_label(db: Session, name: str):
+    # Joined from the association index, so a rare label costs as little as a common one.
+    query = db.query(GitHubIssue).join(
+        IssueLabel, and_(IssueLabel.tenant_id == GitHubIssue.tenant_id, IssueLabel.issue_id == GitHubIssue.id)
+    )
+    return query.filter(IssueLabel.label_id == label_id(db, name)), (IssueLabel.created_at, IssueLabel.issue_id)
+
+def label_counts(db: Session):
+    rows = db.execute(
+        select(IssueLabel.label_id, IssueLabel.state, func.count())
+        .group_by(IssueLabel.label_id, IssueLabel.state)
+    ).all()
+    names = dict(db.execute(select(Label.id, Label.name)).all()) if rows else {}
+    counts = defaultdict(lambda: {"open": 0, "closed": 0, "total": 0})
+    for label, state, count in rows:
+        entry = counts[names.get(label)]
+        if state in ("open", "closed"):
+            entry[state] += count
+        entry["total"] += count
+    counts.pop(None, None)
+    return dict(sorted(counts.items(), key=lambda item: (-item[1]["total"], item[0])))
+
+def _issue_batches(db: Session):
+    # Walks the (tenant_id, issue_id) unique index; ordering on the row id would re-sort the tenant's issues per batch.
+    query = (
+        select(GitHubIssue.id, GitHubIssue.issue_id, GitHubIssue.created_at, GitHubIssue.state, GitHubIssue.labels)
+        .order_by(GitHubIssue.issue_id)
+        .limit(REBUILD_CHUNK_SIZE)
+    )
+    rows = db.execute(query).all()
+    while rows:
+        yield {row_id: (created_at, state, label_names({"labels": labels})) for row_id, _, created_at, state, labels in rows}
+        rows = db.execute(query.where(GitHubIssue.issue_id > rows[-1][1])).all()
+
+def rebuild(db: Session):
+    db.execute(delete(IssueLabel), execution_options={"synchronize_session": False})
+    added = 0
+    for issues in _issue_batches(db):
+        rows = list(_wanted_rows(db, issues).values())
+        if rows:
+            db.execute(insert(IssueLabel.__table__), rows)
+        added += len(rows)
+    return added
+
+def check(db: Session):
+    drift = []
+    for issues in _issue_batches(db):
+        actual = defaultdict(set)
+        for chunk in chunks(list(issues), LOOKUP_CHUNK_SIZE):
+            rows = db.execute(
+                select(IssueLabel.issue_id, Label.name, IssueLabel.state)
+                .join(Label, Label.id == IssueLabel.label_id)
+                .where(IssueLabel.issue_id.in_(chunk))
+            )
+            for issue_id, name, state in rows:
+                actual[issue_id].add((name, state))
+        for issue_id, (_, state, names) in issues.items():
+            expected = {(name, state) for name in names}
+            if expected != actual.get(issue_id, set()):
+                drift.append({"issue_id": issue_id, "expected": sorted(expected), "actual": sorted(actual.get(issue_id, set()))})
+    return drift
+
+def ensure_issue_labels(db: Session):
+    for tenant in tenant_ids(db, GitHubIssue):
+        with tenant_scope(tenant):
+            has_index = db.execute(select(select(IssueLabel.id).exists())).scalar()
+            has_labels = db.execute(select(select(GitHubIssue.id).where(GitHubIssue.labels != "").exists())).scalar()
+            if has_labels and not has_index:
+                rebuild(db)
+    db.commit()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the normalized GitHub issue label index")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--tenant", action="append", help="defaults to every tenant with issues")
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        drifted = False
+        for tenant in args.tenant or tenant_ids(db, GitHubIssue):
+            with tenant_scope(tenant):
+                if args.command == "rebuild":
+                    print(f"{tenant}: indexed {rebuild(db)} issue labels")
+                    continue
+                drift = check(db)
+                drifted = drifted or bool(drift)
+                print(f"{tenant}: {len(drift)} issues with drifted labels")
+                for entry in drift[:20]:
+                    print(f"  {entry}")
+        db.commit()
+        return 1 if drifted else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
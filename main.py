@@ -1,27 +1,101 @@
 import os
+import json
+from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI, Request, Depends, HTTPException, Form, Query
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, Response, StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
-from database import engine, get_db, Base
-from models import Order, Customer, Event, StripePayment, GitHubIssue, WeatherData, SyncLog, AuditLog
-from auth import create_access_token, authenticate_user, get_current_user, get_admin_user, require_role
-from external_api import router as external_router, generate_mock_orders
-from integrations import fetch_stripe_payments, fetch_github_issues, fetch_weather_data
+from database import engine, engines, replica_router, get_db, get_read_db, db_session, Database, Base, SessionLocal, ensure_columns, ensure_indexes, dispose_async_engines
+from models import Order, StripePayment, GitHubIssue, SyncState, SyncJob
+from auth import create_access_token, authenticate_user, get_current_user, get_admin_user, get_request_token, revoke_token
+from external_api import router as external_router
+from integrations import http_client
+from metrics import get_metrics_snapshot
+from rollups import ensure_rollups
+from labels import ensure_issue_labels, issues_with_label
+from weather_store import ensure_weather_store, latest_readings, rollup_series
+from pagination import keyset_page
+from pipeline import STREAM_SOURCES
+from jobs import job_queue, enqueue, job_to_dict
+from page_cache import page_cache, etag_matches
+from data_version import data_versions, read_data_version
+from audit import audit, audit_writer
+from broadcast import metrics_broadcaster
+from instrumentation import InstrumentationMiddleware, render_metrics
+from export import EXPORT_TABLES, EXPORT_FORMATS, COLUMNAR_FORMATS, export_stream, pyarrow
+from tenancy import DEFAULT_TENANT, current_tenant, ensure_tenant_schema, ensure_tenant_partitions
+from search import (
+    SEARCH_SOURCES, SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE, ensure_search_index, ensure_replica_search_index, search_supported, search
+)
+from webhooks import (
+    webhook_secret, verify_stripe_signature, verify_github_signature,
+    stripe_event_record, github_event_record, webhook_buffer
+)
 
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+LOOPBACK_HOSTS = ("127.0.0.1", "::1")
+
+ensure_tenant_schema(engine, Base.metadata)
 Base.metadata.create_all(bind=engine)
+ensure_tenant_partitions(engine, Base.metadata)
+ensure_columns()
+ensure_indexes()
+ensure_search_index(engine)
+SEARCH_READS_REPLICA = ensure_replica_search_index()
+
+with SessionLocal() as db:
+    ensure_rollups(db)
+    ensure_issue_labels(db)
+    ensure_weather_store(db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_queue.start()
+    metrics_broadcaster.start()
+    yield
+    await webhook_buffer.stop()
+    await metrics_broadcaster.stop()
+    await job_queue.stop()
+    await http_client.aclose()
+    audit_writer.close()
+    await dispose_async_engines()
 
-app = FastAPI(title="Integration POC Demo", version="1.0.0")
+app = FastAPI(title="Integration POC Demo", version="1.0.0", lifespan=lifespan)
 
+app.add_middleware(InstrumentationMiddleware)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 app.include_router(external_router)
 
+def _page_response(request: Request, etag: str, body: bytes = None):
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        page_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(body, headers=headers)
+
+async def lookup_page(request: Request, user: dict):
+    # Runs before any read session is opened, so a hit or a 304 never checks out a connection or probes the replica.
+    version = await data_versions.current()
+    key = page_cache.key(request, user)
+    etag = page_cache.etag(key, version)
+    if etag_matches(request, etag):
+        return _page_response(request, etag)
+    entry = page_cache.get(key, version)
+    if entry is None:
+        return None
+    return _page_response(request, entry["etag"], entry["body"])
+
+def render_page(request: Request, user: dict, name: str, context: dict, version: int):
+    # version is read in the session that loaded the page, so a lagging replica never tags old data as current.
+    response = templates.TemplateResponse(name, {"request": request, "user": user, **context})
+    entry = page_cache.put(page_cache.key(request, user), response.body, version)
+    return _page_response(request, entry["etag"], entry["body"])
+
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
     return RedirectResponse(url="/login")
@@ -31,292 +105,430 @@ async def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @app.post("/login")
-async def login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
+async def login(request: Request, username: str = Form(...), password: str = Form(...)):
     user = authenticate_user(username, password)
     if not user:
         return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid credentials"})
     
-    token = create_access_token({"sub": user["username"], "role": user["role"], "name": user["name"]})
+    token = create_access_token({"sub": user["username"], "role": user["role"], "name": user["name"], "tenant": user["tenant"]})
+    current_tenant.set(user["tenant"])
     
-    audit = AuditLog(user=username, action="login", resource="auth", details="User logged in")
-    db.add(audit)
-    db.commit()
+    await audit(username, "login", "auth", details="User logged in", ip_address=request.client.host if request.client else None, durable=True)
     
     response = RedirectResponse(url="/dashboard", status_code=302)
     response.set_cookie(key="access_token", value=token, httponly=True, max_age=3600)
     return response
 
 @app.get("/logout")
-async def logout():
+async def logout(request: Request):
+    token = get_request_token(request)
+    if token:
+        revoke_token(token)
     response = RedirectResponse(url="/login", status_code=302)
     response.delete_cookie("access_token")
     return response
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request, db: Session = Depends(get_db)):
+async def dashboard(request: Request):
     try:
         user = await get_current_user(request)
     except HTTPException:
         return RedirectResponse(url="/login")
     
-    orders_count = db.query(func.count(Order.id)).scalar() or 0
-    orders_pending = db.query(func.count(Order.id)).filter(Order.status == "pending").scalar() or 0
-    orders_completed = db.query(func.count(Order.id)).filter(Order.status == "completed").scalar() or 0
-    total_revenue = db.query(func.sum(Order.amount)).filter(Order.status == "completed").scalar() or 0
-    
-    stripe_count = db.query(func.count(StripePayment.id)).scalar() or 0
-    github_count = db.query(func.count(GitHubIssue.id)).scalar() or 0
-    weather_count = db.query(func.count(WeatherData.id)).scalar() or 0
-    
-    last_sync = db.query(SyncLog).order_by(SyncLog.synced_at.desc()).first()
-    last_sync_time = last_sync.synced_at.strftime("%Y-%m-%d %H:%M:%S") if last_sync else "Never"
-    
-    return templates.TemplateResponse("dashboard.html", {
-        "request": request,
-        "user": user,
-        "orders_count": orders_count,
-        "orders_pending": orders_pending,
-        "orders_completed": orders_completed,
-        "total_revenue": round(total_revenue, 2),
-        "stripe_count": stripe_count,
-        "github_count": github_count,
-        "weather_count": weather_count,
+    cached = await lookup_page(request, user)
+    if cached is not None:
+        return cached
+    
+    def load(session: Session):
+        return read_data_version(session), get_metrics_snapshot(session)
+    
+    async with db_session(read=True) as db:
+        version, snapshot = await db.run(load)
+    last_sync = snapshot["last_sync"]
+    last_sync_time = last_sync.strftime("%Y-%m-%d %H:%M:%S") if last_sync else "Never"
+    
+    return render_page(request, user, "dashboard.html", {
+        "orders_count": snapshot["orders"]["total"],
+        "orders_pending": snapshot["orders"]["pending"],
+        "orders_completed": snapshot["orders"]["completed"],
+        "total_revenue": snapshot["orders"]["revenue"],
+        "stripe_count": snapshot["stripe"]["total"],
+        "github_count": snapshot["github"]["total"],
+        "weather_count": snapshot["weather"]["readings"],
         "last_sync_time": last_sync_time
-    })
+    }, version)
 
 @app.get("/orders", response_class=HTMLResponse)
-async def orders_page(request: Request, status: str = Query(None), page: int = Query(1), db: Session = Depends(get_db)):
+async def orders_page(request: Request, status: str = Query(None), after: str = Query(None), before: str = Query(None)):
     try:
         user = await get_current_user(request)
     except HTTPException:
         return RedirectResponse(url="/login")
     
-    query = db.query(Order)
-    if status:
-        query = query.filter(Order.status == status)
+    cached = await lookup_page(request, user)
+    if cached is not None:
+        return cached
+    
+    def load(session: Session):
+        query = session.query(Order)
+        if status:
+            query = query.filter(Order.status == status)
+        return read_data_version(session), keyset_page(query, Order, after=after, before=before, per_page=20), get_metrics_snapshot(session)
     
-    per_page = 20
-    total = query.count()
-    orders = query.order_by(Order.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
-    total_pages = (total + per_page - 1) // per_page
+    async with db_session(read=True) as db:
+        version, page, snapshot = await db.run(load)
+    by_status = snapshot["orders"]["by_status"]
+    total = by_status.get(status, 0) if status else sum(by_status.values())
     
-    return templates.TemplateResponse("orders.html", {
-        "request": request,
-        "user": user,
-        "orders": orders,
+    return render_page(request, user, "orders.html", {
+        "orders": page["items"],
         "current_status": status,
-        "page": page,
-        "total_pages": total_pages,
+        "next_cursor": page["next_cursor"],
+        "prev_cursor": page["prev_cursor"],
         "total": total
-    })
+    }, version)
 
 @app.get("/stripe", response_class=HTMLResponse)
-async def stripe_page(request: Request, db: Session = Depends(get_db)):
+async def stripe_page(request: Request, after: str = Query(None), before: str = Query(None)):
     try:
         user = await get_current_user(request)
     except HTTPException:
         return RedirectResponse(url="/login")
     
-    payments = db.query(StripePayment).order_by(StripePayment.created_at.desc()).limit(50).all()
-    total_amount = db.query(func.sum(StripePayment.amount)).filter(StripePayment.status == "succeeded").scalar() or 0
-    succeeded_count = db.query(func.count(StripePayment.id)).filter(StripePayment.status == "succeeded").scalar() or 0
-    pending_count = db.query(func.count(StripePayment.id)).filter(StripePayment.status == "pending").scalar() or 0
+    cached = await lookup_page(request, user)
+    if cached is not None:
+        return cached
+    
+    def load(session: Session):
+        return read_data_version(session), keyset_page(session.query(StripePayment), StripePayment, after=after, before=before, per_page=50), get_metrics_snapshot(session)
+    
+    async with db_session(read=True) as db:
+        version, page, snapshot = await db.run(load)
     
-    return templates.TemplateResponse("stripe.html", {
-        "request": request,
-        "user": user,
-        "payments": payments,
-        "total_amount": round(total_amount, 2),
-        "succeeded_count": succeeded_count,
-        "pending_count": pending_count
-    })
+    return render_page(request, user, "stripe.html", {
+        "payments": page["items"],
+        "next_cursor": page["next_cursor"],
+        "prev_cursor": page["prev_cursor"],
+        "total_amount": snapshot["stripe"]["volume"],
+        "succeeded_count": snapshot["stripe"]["succeeded"],
+        "pending_count": snapshot["stripe"]["pending"]
+    }, version)
 
 @app.get("/github", response_class=HTMLResponse)
-async def github_page(request: Request, db: Session = Depends(get_db)):
+async def github_page(request: Request, label: str = Query(None), after: str = Query(None), before: str = Query(None)):
     try:
         user = await get_current_user(request)
     except HTTPException:
         return RedirectResponse(url="/login")
     
-    issues = db.query(GitHubIssue).order_by(GitHubIssue.created_at.desc()).limit(50).all()
-    open_count = db.query(func.count(GitHubIssue.id)).filter(GitHubIssue.state == "open").scalar() or 0
-    closed_count = db.query(func.count(GitHubIssue.id)).filter(GitHubIssue.state == "closed").scalar() or 0
-    
-    return templates.TemplateResponse("github.html", {
-        "request": request,
-        "user": user,
-        "issues": issues,
-        "open_count": open_count,
-        "closed_count": closed_count
-    })
+    cached = await lookup_page(request, user)
+    if cached is not None:
+        return cached
+    
+    def load(session: Session):
+        query, columns = issues_with_label(session, label) if label else (session.query(GitHubIssue), None)
+        return read_data_version(session), keyset_page(query, GitHubIssue, after=after, before=before, per_page=50, columns=columns), get_metrics_snapshot(session)
+    
+    async with db_session(read=True) as db:
+        version, page, snapshot = await db.run(load)
+    labels = snapshot["github"]["labels"]
+    counts = labels.get(label, {"open": 0, "closed": 0}) if label else snapshot["github"]
+    
+    return render_page(request, user, "github.html", {
+        "issues": page["items"],
+        "current_label": label,
+        "labels": labels,
+        "next_cursor": page["next_cursor"],
+        "prev_cursor": page["prev_cursor"],
+        "open_count": counts["open"],
+        "closed_count": counts["closed"]
+    }, version)
 
 @app.get("/weather", response_class=HTMLResponse)
-async def weather_page(request: Request, db: Session = Depends(get_db)):
+async def weather_page(request: Request):
     try:
         user = await get_current_user(request)
     except HTTPException:
         return RedirectResponse(url="/login")
     
-    weather = db.query(WeatherData).order_by(WeatherData.recorded_at.desc()).all()
-    cities_count = db.query(func.count(func.distinct(WeatherData.city))).scalar() or 0
-    avg_temp = db.query(func.avg(WeatherData.temperature)).scalar() or 0
+    cached = await lookup_page(request, user)
+    if cached is not None:
+        return cached
+    
+    def load(session: Session):
+        return read_data_version(session), latest_readings(session), rollup_series(session, "day", days=7), get_metrics_snapshot(session)
+    
+    async with db_session(read=True) as db:
+        version, weather, daily, snapshot = await db.run(load)
     
-    return templates.TemplateResponse("weather.html", {
-        "request": request,
-        "user": user,
+    return render_page(request, user, "weather.html", {
         "weather": weather,
-        "cities_count": cities_count,
-        "avg_temp": round(avg_temp, 1)
-    })
+        "daily": daily,
+        "cities_count": snapshot["weather"]["cities"],
+        "avg_temp": snapshot["weather"]["avg_temp"]
+    }, version)
+
+async def _enqueue_sync(request: Request, db: Database, source: str, user: dict, params: dict = None):
+    job, created = await db.run(enqueue, source, params=params, requested_by=user.get("sub"))
+    await audit(user.get("sub"), "sync_requested", source, details=f"Job {job.id}", ip_address=request.client.host if request.client else None)
+    return JSONResponse({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "source": source,
+        "deduplicated": not created
+    }, status_code=202)
 
 @app.post("/api/sync/orders")
-async def sync_orders(request: Request, db: Session = Depends(get_db)):
+async def sync_orders(request: Request, db: Database = Depends(get_db)):
     try:
         user = await get_admin_user(request)
     except HTTPException as e:
         return JSONResponse({"error": e.detail}, status_code=e.status_code)
     
-    mock_orders = generate_mock_orders()
-    
-    synced = 0
-    for order_data in mock_orders:
-        existing = db.query(Order).filter(Order.external_id == order_data["id"]).first()
-        if not existing:
-            order = Order(
-                external_id=order_data["id"],
-                customer_name=order_data["customer_name"],
-                status=order_data["status"],
-                amount=order_data["amount"],
-                source="mock_saas"
-            )
-            db.add(order)
-            synced += 1
-    
-    sync_log = SyncLog(source="mock_saas", records_synced=synced, status="success")
-    db.add(sync_log)
-    
-    audit = AuditLog(user=user.get("sub"), action="sync", resource="orders", details=f"Synced {synced} orders")
-    db.add(audit)
-    db.commit()
-    
-    return {"success": True, "synced": synced, "source": "mock_saas"}
+    return await _enqueue_sync(request, db, "orders", user)
 
 @app.post("/api/sync/stripe")
-async def sync_stripe(request: Request, db: Session = Depends(get_db)):
+async def sync_stripe(request: Request, db: Database = Depends(get_db)):
     try:
         user = await get_admin_user(request)
     except HTTPException as e:
         return JSONResponse({"error": e.detail}, status_code=e.status_code)
     
-    result = fetch_stripe_payments()
-    synced = 0
-    
-    for payment_data in result.get("data", []):
-        existing = db.query(StripePayment).filter(StripePayment.payment_id == payment_data["payment_id"]).first()
-        if not existing:
-            payment = StripePayment(
-                payment_id=payment_data["payment_id"],
-                amount=payment_data["amount"],
-                currency=payment_data["currency"],
-                status=payment_data["status"],
-                customer_email=payment_data["customer_email"],
-                description=payment_data["description"]
-            )
-            db.add(payment)
-            synced += 1
-    
-    sync_log = SyncLog(source="stripe", records_synced=synced, status="success")
-    db.add(sync_log)
-    db.commit()
-    
-    return {"success": True, "synced": synced, "source": result.get("source")}
+    return await _enqueue_sync(request, db, "stripe", user)
 
 @app.post("/api/sync/github")
-async def sync_github(request: Request, db: Session = Depends(get_db)):
+async def sync_github(request: Request, db: Database = Depends(get_db)):
     try:
         user = await get_admin_user(request)
     except HTTPException as e:
         return JSONResponse({"error": e.detail}, status_code=e.status_code)
     
-    result = fetch_github_issues()
-    synced = 0
-    
-    for issue_data in result.get("data", []):
-        existing = db.query(GitHubIssue).filter(GitHubIssue.issue_id == issue_data["issue_id"]).first()
-        if not existing:
-            issue = GitHubIssue(
-                issue_id=issue_data["issue_id"],
-                title=issue_data["title"],
-                state=issue_data["state"],
-                author=issue_data["author"],
-                repository=issue_data["repository"],
-                labels=issue_data["labels"]
-            )
-            db.add(issue)
-            synced += 1
-    
-    sync_log = SyncLog(source="github", records_synced=synced, status="success")
-    db.add(sync_log)
-    db.commit()
-    
-    return {"success": True, "synced": synced, "source": result.get("source")}
+    return await _enqueue_sync(request, db, "github", user)
 
 @app.post("/api/sync/weather")
-async def sync_weather(request: Request, db: Session = Depends(get_db)):
+async def sync_weather(request: Request, db: Database = Depends(get_db)):
     try:
         user = await get_admin_user(request)
     except HTTPException as e:
         return JSONResponse({"error": e.detail}, status_code=e.status_code)
     
-    result = fetch_weather_data()
-    synced = 0
+    return await _enqueue_sync(request, db, "weather", user)
+
+@app.post("/api/sync/{source}/backfill")
+async def backfill_source(request: Request, source: str, restart: bool = Query(False), db: Database = Depends(get_db)):
+    try:
+        user = await get_admin_user(request)
+    except HTTPException as e:
+        return JSONResponse({"error": e.detail}, status_code=e.status_code)
     
-    for weather_data in result.get("data", []):
-        weather = WeatherData(
-            city=weather_data["city"],
-            temperature=weather_data["temperature"],
-            feels_like=weather_data["feels_like"],
-            humidity=weather_data["humidity"],
-            description=weather_data["description"],
-            wind_speed=weather_data["wind_speed"]
-        )
-        db.add(weather)
-        synced += 1
+    if source not in STREAM_SOURCES:
+        return JSONResponse({"error": f"Backfill not supported for {source}"}, status_code=404)
     
-    sync_log = SyncLog(source="openweather", records_synced=synced, status="success")
-    db.add(sync_log)
-    db.commit()
+    return await _enqueue_sync(request, db, source, user, params={"mode": "backfill", "restart": restart})
+
+@app.get("/api/sync/jobs/{job_id}")
+async def get_sync_job(request: Request, job_id: int, db: Database = Depends(get_db)):
+    try:
+        user = await get_current_user(request)
+    except HTTPException:
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
     
-    return {"success": True, "synced": synced, "source": result.get("source")}
+    job = await db.run(Session.get, SyncJob, job_id)
+    if job is None or job.tenant_id != current_tenant.get():
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    return job_to_dict(job)
+
+@app.get("/api/sync/state")
+async def get_sync_states(request: Request, db: Database = Depends(get_db)):
+    try:
+        user = await get_current_user(request)
+    except HTTPException:
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    
+    states = await db.run(lambda session: session.query(SyncState).all())
+    return {
+        state.source: {
+            "status": state.status,
+            "cursor": state.cursor,
+            "pages": state.pages,
+            "records_processed": state.records_processed,
+            "high_water": state.high_water,
+            "started_at": state.started_at.isoformat() if state.started_at else None,
+            "updated_at": state.updated_at.isoformat() if state.updated_at else None
+        }
+        for state in states
+    }
+
+@app.get("/api/cache/stats")
+async def get_cache_stats(request: Request):
+    try:
+        user = await get_current_user(request)
+    except HTTPException:
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    
+    return {"pages": page_cache.stats(), "audit": audit_writer.stats(), "stream": metrics_broadcaster.stats()}
 
 @app.get("/api/metrics")
-async def get_metrics(request: Request, db: Session = Depends(get_db)):
+async def get_metrics(request: Request, db: Database = Depends(get_read_db)):
     try:
         user = await get_current_user(request)
     except HTTPException:
         return JSONResponse({"error": "Unauthorized"}, status_code=401)
     
+    snapshot = await db.run(get_metrics_snapshot)
     return {
-        "orders": {
-            "total": db.query(func.count(Order.id)).scalar() or 0,
-            "pending": db.query(func.count(Order.id)).filter(Order.status == "pending").scalar() or 0,
-            "completed": db.query(func.count(Order.id)).filter(Order.status == "completed").scalar() or 0,
-            "revenue": round(db.query(func.sum(Order.amount)).filter(Order.status == "completed").scalar() or 0, 2)
-        },
+        "orders": snapshot["orders"],
         "stripe": {
-            "total": db.query(func.count(StripePayment.id)).scalar() or 0,
-            "volume": round(db.query(func.sum(StripePayment.amount)).filter(StripePayment.status == "succeeded").scalar() or 0, 2)
+            "total": snapshot["stripe"]["total"],
+            "volume": snapshot["stripe"]["volume"]
         },
         "github": {
-            "total": db.query(func.count(GitHubIssue.id)).scalar() or 0,
-            "open": db.query(func.count(GitHubIssue.id)).filter(GitHubIssue.state == "open").scalar() or 0
+            "total": snapshot["github"]["total"],
+            "open": snapshot["github"]["open"]
         },
         "weather": {
-            "cities": db.query(func.count(func.distinct(WeatherData.city))).scalar() or 0,
-            "readings": db.query(func.count(WeatherData.id)).scalar() or 0
+            "cities": snapshot["weather"]["cities"],
+            "readings": snapshot["weather"]["readings"]
         }
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    # Scrapers don't carry the session cookie; with METRICS_TOKEN set they send it as a bearer token.
+    # Without one, only a scraper on the same host or a signed-in admin may read the cross-tenant counters.
+    if METRICS_TOKEN:
+        if request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+            return PlainTextResponse("Unauthorized\n", status_code=401)
+    elif not (request.client and request.client.host in LOOPBACK_HOSTS):
+        try:
+            await get_admin_user(request)
+        except HTTPException as e:
+            return PlainTextResponse(f"{e.detail}\n", status_code=e.status_code)
+    return PlainTextResponse(render_metrics(engines, replica_router, http_client.breakers), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/export/{table}")
+async def export_table(
+    request: Request,
+    table: str,
+    format: str = Query("csv"),
+    status: str = Query(None),
+    created_after: str = Query(None),
+    created_before: str = Query(None)
+):
+    try:
+        user = await get_current_user(request)
+    except HTTPException:
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    
+    if table not in EXPORT_TABLES:
+        return JSONResponse({"error": f"Unknown table {table}"}, status_code=404)
+    if format not in EXPORT_FORMATS:
+        return JSONResponse({"error": f"Unsupported format {format}"}, status_code=400)
+    if format in COLUMNAR_FORMATS and pyarrow is None:
+        return JSONResponse({"error": f"{format} export requires pyarrow"}, status_code=501)
+    try:
+        after = datetime.fromisoformat(created_after) if created_after else None
+        before = datetime.fromisoformat(created_before) if created_before else None
+    except ValueError:
+        return JSONResponse({"error": "created_after and created_before must be ISO dates"}, status_code=400)
+    
+    await audit(user.get("sub"), "export", table, details=f"format={format} status={status} created_after={created_after} created_before={created_before}", ip_address=request.client.host if request.client else None)
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        export_stream(table, format, status=status, created_after=after, created_before=before),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{extension}"'}
+    )
+
+@app.get("/api/search")
+async def search_records(
+    request: Request,
+    q: str = Query(""),
+    source: list[str] = Query(None),
+    limit: int = Query(SEARCH_PAGE_SIZE),
+    cursor: str = Query(None)
+):
+    try:
+        user = await get_current_user(request)
+    except HTTPException:
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    
+    if not search_supported():
+        return JSONResponse({"error": "Search requires SQLite or PostgreSQL"}, status_code=501)
+    unknown = [name for name in source or [] if name not in SEARCH_SOURCES]
+    if unknown:
+        return JSONResponse({"error": f"Unknown source {unknown[0]}"}, status_code=400)
+    if not q.strip():
+        return JSONResponse({"error": "q is required"}, status_code=400)
+    limit = min(max(limit, 1), SEARCH_MAX_PAGE_SIZE)
+    
+    async with db_session(read=SEARCH_READS_REPLICA) as db:
+        page = await db.run(search, q, source, limit, cursor)
+    return {"query": q, **page}
+
+@app.get("/api/stream/metrics")
+async def stream_metrics(request: Request):
+    try:
+        user = await get_current_user(request)
+    except HTTPException:
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    
+    subscriber = await metrics_broadcaster.subscribe()
+    if subscriber is None:
+        return JSONResponse({"error": "Too many live connections"}, status_code=503, headers={"Retry-After": "30"})
+    
+    return StreamingResponse(
+        metrics_broadcaster.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _webhook_response(written):
+    if written is None:
+        return JSONResponse({"error": "Webhook buffer full"}, status_code=503, headers={"Retry-After": "1"})
+    if not written:
+        return JSONResponse({"error": "Failed to store event"}, status_code=503, headers={"Retry-After": "5"})
+    return {"received": True}
+
+# The unprefixed paths deliver to DEFAULT_TENANT; every other tenant has its own path and secret.
+@app.post("/webhooks/stripe")
+@app.post("/webhooks/{tenant}/stripe")
+async def stripe_webhook(request: Request):
+    tenant = request.path_params.get("tenant", DEFAULT_TENANT)
+    secret = webhook_secret("stripe", tenant)
+    if not secret:
+        return JSONResponse({"error": "Stripe webhooks are not configured"}, status_code=404)
+    payload = await request.body()
+    if not verify_stripe_signature(payload, request.headers.get("Stripe-Signature"), secret):
+        return JSONResponse({"error": "Invalid signature"}, status_code=400)
+    try:
+        record = stripe_event_record(json.loads(payload))
+    except (ValueError, KeyError, TypeError):
+        return JSONResponse({"error": "Malformed event"}, status_code=400)
+    if record is None:
+        return {"received": True, "ignored": True}
+    return _webhook_response(await webhook_buffer.submit("stripe", tenant, record))
+
+@app.post("/webhooks/github")
+@app.post("/webhooks/{tenant}/github")
+async def github_webhook(request: Request):
+    tenant = request.path_params.get("tenant", DEFAULT_TENANT)
+    secret = webhook_secret("github", tenant)
+    if not secret:
+        return JSONResponse({"error": "GitHub webhooks are not configured"}, status_code=404)
+    payload = await request.body()
+    if not verify_github_signature(payload, request.headers.get("X-Hub-Signature-256"), secret):
+        return JSONResponse({"error": "Invalid signature"}, status_code=400)
+    try:
+        record = github_event_record(request.headers.get("X-GitHub-Event"), json.loads(payload))
+    except (ValueError, KeyError, TypeError):
+        return JSONResponse({"error": "Malformed event"}, status_code=400)
+    if record is None:
+        return {"received": True, "ignored": True}
+    return _webhook_response(await webhook_buffer.submit("github", tenant, record))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=5000)
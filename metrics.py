@@ -0,0 +1,94 @@
+import os
+import time
+import threading
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import Session
+
+from models import GitHubIssue, WeatherLatest, WeatherRollup, SyncLog
+from rollups import rollup_totals
+from labels import label_counts
+from data_version import read_data_version
+from tenancy import current_tenant
+
+METRICS_CACHE_TTL = float(os.environ.get("METRICS_CACHE_TTL", "30"))
+
+def _count_where(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def compute_snapshot(db: Session):
+    orders = rollup_totals(db, "orders")
+    stripe = rollup_totals(db, "stripe")
+
+    github = db.execute(select(
+        func.count(GitHubIssue.id),
+        _count_where(GitHubIssue.state == "open"),
+        _count_where(GitHubIssue.state == "closed"),
+    )).one()
+
+    # Daily rollups outlive raw-reading compaction, so they carry the all-time totals.
+    weather = db.execute(
+        select(
+            func.coalesce(func.sum(WeatherRollup.readings), 0),
+            func.coalesce(func.sum(WeatherRollup.temperature_sum), 0),
+        )
+        .where(WeatherRollup.granularity == "day")
+    ).one()
+    cities = db.execute(select(func.count(WeatherLatest.id))).scalar()
+
+    last_sync = db.execute(select(func.max(SyncLog.synced_at))).scalar()
+
+    return {
+        "orders": {
+            "total": sum(count for count, _ in orders.values()),
+            "pending": orders.get("pending", (0, 0))[0],
+            "completed": orders.get("completed", (0, 0))[0],
+            "revenue": round(orders.get("completed", (0, 0))[1], 2),
+            "by_status": {status: count for status, (count, _) in orders.items()}
+        },
+        "stripe": {
+            "total": sum(count for count, _ in stripe.values()),
+            "succeeded": stripe.get("succeeded", (0, 0))[0],
+            "pending": stripe.get("pending", (0, 0))[0],
+            "volume": round(stripe.get("succeeded", (0, 0))[1], 2)
+        },
+        "github": {
+            "total": github[0],
+            "open": github[1],
+            "closed": github[2],
+            "labels": label_counts(db)
+        },
+        "weather": {
+            "readings": weather[0],
+            "cities": cities,
+            "avg_temp": round(weather[1] / weather[0], 1) if weather[0] else 0
+        },
+        "last_sync": last_sync
+    }
+
+class MetricsCache:
+    def __init__(self, ttl: float = METRICS_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshots = {}
+
+    def get(self, db: Session):
+        tenant = current_tenant.get()
+        # The version is shared by every worker, so a sync anywhere retires this worker's snapshot too.
+        version = read_data_version(db)
+        with self._lock:
+            cached = self._snapshots.get(tenant)
+            if cached is not None and cached[1] == version and time.monotonic() < cached[2]:
+                return cached[0]
+
+        snapshot = compute_snapshot(db)
+
+        with self._lock:
+            cached = self._snapshots.get(tenant)
+            if cached is None or cached[1] <= version:
+                self._snapshots[tenant] = (snapshot, version, time.monotonic() + self.ttl)
+        return snapshot
+
+metrics_cache = MetricsCache()
+
+def get_metrics_snapshot(db: Session):
+    return metrics_cache.get(db)
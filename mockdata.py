@@ -0,0 +1,207 @@
+import os
+from datetime import datetime
+import numpy as np
+
+MOCK_CHUNK_SIZE = int(os.environ.get("MOCK_CHUNK_SIZE", "100000"))
+# Seeded runs are anchored to a fixed clock so the same seed always yields the same timestamps.
+MOCK_SEED_EPOCH = os.environ.get("MOCK_SEED_EPOCH", "2025-01-01T00:00:00")
+
+CUSTOMER_NAMES = [
+    "Acme Corp", "TechStart Inc", "Global Solutions", "InnovateTech",
+    "DataFlow Systems", "CloudNine Ltd", "ByteWise Solutions", "NextGen Dynamics",
+    "Alpha Industries", "Quantum Labs", "Cyber Solutions", "Digital Frontier",
+    "Smart Systems", "Future Tech", "Pioneer Enterprises", "Velocity Corp"
+]
+
+PRODUCT_NAMES = [
+    "Enterprise License", "Pro Subscription", "Basic Plan", "Premium Support",
+    "API Access", "Data Analytics", "Cloud Storage", "Security Suite",
+    "Team Collaboration", "Integration Package", "Custom Development", "Consulting Hours"
+]
+
+EVENT_TYPES = [
+    "user.created", "user.updated", "order.placed", "order.completed",
+    "payment.received", "subscription.renewed", "account.upgraded", "support.ticket.opened"
+]
+
+ISSUE_TITLES = [
+    "Bug: Component not rendering correctly",
+    "Feature request: Add dark mode support",
+    "Performance issue with large datasets",
+    "Documentation update needed",
+    "Refactor: Improve code organization",
+    "Fix: Memory leak in event handler",
+    "Add unit tests for new module",
+    "Update dependencies to latest versions"
+]
+
+WEATHER_CITIES = ["London", "New York", "Tokyo", "Sydney", "Paris"]
+
+# Categorical fields map choice -> weight; numeric fields are (distribution, a, b) with
+# distribution one of uniform, normal, lognormal or integers. Any entry can be overridden per call.
+DISTRIBUTIONS = {
+    "customers": {
+        "name": {name: 1 for name in CUSTOMER_NAMES},
+        "company": {name: 1 for name in CUSTOMER_NAMES},
+        "age_days": ("integers", 1, 365),
+    },
+    "orders": {
+        "customer_name": {name: 1 for name in CUSTOMER_NAMES},
+        "product": {name: 1 for name in PRODUCT_NAMES},
+        "status": {"pending": 0.15, "completed": 0.60, "processing": 0.15, "cancelled": 0.10},
+        "amount": ("uniform", 99.99, 9999.99),
+        "age_days": ("integers", 0, 90),
+    },
+    "events": {
+        "type": {event_type: 1 for event_type in EVENT_TYPES},
+        "age_hours": ("integers", 0, 168),
+    },
+    "stripe_payments": {
+        "status": {"succeeded": 0.8, "pending": 0.15, "failed": 0.05},
+        "amount": ("uniform", 10, 500),
+        "customer_email": {email: 1 for email in ["customer@example.com", "buyer@company.com", "user@business.org", "client@startup.io"]},
+        "order_number": ("integers", 1000, 9999),
+        "age_days": ("integers", 0, 0),
+    },
+    "github_issues": {
+        "title": {title: 1 for title in ISSUE_TITLES},
+        "state": {"open": 1, "closed": 1},
+        "author": {author: 1 for author in ["developer1", "contributor42", "maintainer", "user123", "coder99"]},
+        "repository": {repo: 1 for repo in ["facebook/react", "vercel/next.js", "microsoft/vscode"]},
+        "labels": {label: 1 for label in ["bug", "enhancement", "documentation", "help wanted"]},
+        "age_days": ("integers", 0, 0),
+    },
+    "weather": {
+        "city": WEATHER_CITIES,
+        "temperature": ("uniform", -5, 35),
+        "feels_like": ("uniform", -8, 38),
+        "humidity": ("integers", 30, 90),
+        "description": {description: 1 for description in ["clear sky", "few clouds", "scattered clouds", "light rain", "sunny", "overcast"]},
+        "wind_speed": ("uniform", 0, 20),
+        "interval_minutes": ("integers", 60, 60),
+    },
+}
+
+def _categorical(rng, count: int, spec: dict):
+    choices = np.array(list(spec))
+    weights = np.array(list(spec.values()), dtype=float)
+    return choices[rng.choice(len(choices), size=count, p=weights / weights.sum())]
+
+def _numeric(rng, count: int, spec: tuple):
+    distribution, a, b = spec
+    if distribution == "integers":
+        return rng.integers(a, b, size=count, endpoint=True)
+    if distribution == "normal":
+        return rng.normal(a, b, size=count)
+    if distribution == "lognormal":
+        return rng.lognormal(a, b, size=count)
+    return rng.uniform(a, b, size=count)
+
+def _labels(prefix: str, numbers):
+    return np.char.add(prefix, numbers.astype(str))
+
+def _ago(now, amounts, unit: str):
+    return np.datetime64(now, "us") - amounts.astype(f"timedelta64[{unit}]")
+
+def _customers(rng, seq, now, spec):
+    count = len(seq)
+    return {
+        "id": _labels("cust_", 1000 + seq),
+        "name": np.char.add(np.char.add(_categorical(rng, count, spec["name"]), " #"), (seq + 1).astype(str)),
+        "email": np.char.add(np.char.add(_labels("contact", seq + 1), "@company"), np.char.add((seq + 1).astype(str), ".com")),
+        "company": _categorical(rng, count, spec["company"]),
+        "created_at": _ago(now, _numeric(rng, count, spec["age_days"]), "D"),
+    }
+
+def _orders(rng, seq, now, spec):
+    count = len(seq)
+    return {
+        "id": _labels("ord_", 10000 + seq),
+        "customer_name": _categorical(rng, count, spec["customer_name"]),
+        "product": _categorical(rng, count, spec["product"]),
+        "status": _categorical(rng, count, spec["status"]),
+        "amount": np.round(_numeric(rng, count, spec["amount"]), 2),
+        "created_at": _ago(now, _numeric(rng, count, spec["age_days"]), "D"),
+    }
+
+def _events(rng, seq, now, spec):
+    count = len(seq)
+    event_types = _categorical(rng, count, spec["type"])
+    return {
+        "id": _labels("evt_", 20000 + seq),
+        "type": event_types,
+        "description": np.char.add(np.char.add("Event ", event_types), " triggered by system"),
+        "created_at": _ago(now, _numeric(rng, count, spec["age_hours"]), "h"),
+    }
+
+def _stripe_payments(rng, seq, now, spec):
+    count = len(seq)
+    return {
+        "payment_id": _labels("ch_mock_", 100000 + seq),
+        "amount": np.round(_numeric(rng, count, spec["amount"]), 2),
+        "currency": np.full(count, "USD"),
+        "status": _categorical(rng, count, spec["status"]),
+        "customer_email": _categorical(rng, count, spec["customer_email"]),
+        "description": _labels("Payment for order #", _numeric(rng, count, spec["order_number"])),
+        "created_at": _ago(now, _numeric(rng, count, spec["age_days"]), "D"),
+    }
+
+def _github_issues(rng, seq, now, spec):
+    count = len(seq)
+    return {
+        "issue_id": 50000 + seq,
+        "title": np.char.add(np.char.add(_categorical(rng, count, spec["title"]), " #"), (seq + 1).astype(str)),
+        "state": _categorical(rng, count, spec["state"]),
+        "author": _categorical(rng, count, spec["author"]),
+        "repository": _categorical(rng, count, spec["repository"]),
+        "labels": _categorical(rng, count, spec["labels"]),
+        "created_at": _ago(now, _numeric(rng, count, spec["age_days"]), "D"),
+    }
+
+def _weather(rng, seq, now, spec):
+    count = len(seq)
+    cities = np.array(spec["city"])
+    # Row n is city n % len(cities); each full round of cities is one interval further back in time.
+    return {
+        "city": cities[seq % len(cities)],
+        "temperature": np.round(_numeric(rng, count, spec["temperature"]), 1),
+        "feels_like": np.round(_numeric(rng, count, spec["feels_like"]), 1),
+        "humidity": _numeric(rng, count, spec["humidity"]).astype(int),
+        "description": _categorical(rng, count, spec["description"]),
+        "wind_speed": np.round(_numeric(rng, count, spec["wind_speed"]), 1),
+        "recorded_at": _ago(now, (seq // len(cities)) * _numeric(rng, count, spec["interval_minutes"]), "m"),
+    }
+
+GENERATORS = {
+    "customers": _customers,
+    "orders": _orders,
+    "events": _events,
+    "stripe_payments": _stripe_payments,
+    "github_issues": _github_issues,
+    "weather": _weather,
+}
+
+def generate(kind: str, count: int, seed: int = None, start: int = 0, distributions: dict = None, now: datetime = None):
+    # IDs are a pure function of the row position (start + i), so calls over disjoint
+    # ranges never collide and the same (seed, start, count) always reproduces the same rows.
+    rng = np.random.default_rng(None if seed is None else [seed, start])
+    if now is None:
+        now = datetime.fromisoformat(MOCK_SEED_EPOCH) if seed is not None else datetime.utcnow()
+    spec = {**DISTRIBUTIONS[kind], **(distributions or {})}
+    seq = np.arange(start, start + count, dtype=np.int64)
+    return GENERATORS[kind](rng, seq, now, spec)
+
+def iter_chunks(kind: str, count: int, seed: int = None, start: int = 0, chunk_size: int = MOCK_CHUNK_SIZE, distributions: dict = None):
+    now = datetime.fromisoformat(MOCK_SEED_EPOCH) if seed is not None else datetime.utcnow()
+    for offset in range(start, start + count, chunk_size):
+        yield generate(kind, min(chunk_size, start + count - offset), seed=seed, start=offset, distributions=distributions, now=now)
+
+def to_records(columns: dict):
+    converted = {}
+    for name, values in columns.items():
+        if np.issubdtype(values.dtype, np.datetime64):
+            converted[name] = np.datetime_as_string(values, unit="us").tolist()
+        else:
+            converted[name] = values.tolist()
+    names = list(converted)
+    return [dict(zip(names, row)) for row in zip(*converted.values())]
@@ -0,0 +1,153 @@
+import io
+import sys
+import csv
+import json
+import time
+import argparse
+from datetime import datetime
+import numpy as np
+from sqlalchemy import insert
+
+from database import SessionLocal, engine, Base
+from models import Order, Customer, Event, StripePayment, GitHubIssue, WeatherData
+from rollups import ROLLUP_SOURCES, rebuild as rebuild_rollups
+from weather_store import rebuild as rebuild_weather
+from labels import rebuild as rebuild_labels
+from data_version import bump_data_version
+from tenancy import current_tenant, tenant_scope
+from search import ensure_search_index
+from mockdata import MOCK_CHUNK_SIZE, GENERATORS, iter_chunks, to_records
+
+def _as_python(values):
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[us]").tolist()
+    return values.tolist()
+
+# kind -> (model, {model column: generated column or constant})
+DB_TARGETS = {
+    "customers": (Customer, {"external_id": "id", "name": "name", "email": "email", "company": "company", "created_at": "created_at"}),
+    "orders": (Order, {"external_id": "id", "customer_name": "customer_name", "status": "status", "amount": "amount", "created_at": "created_at"}),
+    "events": (Event, {"external_id": "id", "event_type": "type", "description": "description", "created_at": "created_at"}),
+    "stripe_payments": (StripePayment, {
+        "payment_id": "payment_id", "amount": "amount", "currency": "currency", "status": "status",
+        "customer_email": "customer_email", "description": "description", "created_at": "created_at"
+    }),
+    "github_issues": (GitHubIssue, {
+        "issue_id": "issue_id", "title": "title", "state": "state", "author": "author",
+        "repository": "repository", "labels": "labels", "created_at": "created_at"
+    }),
+    "weather": (WeatherData, {
+        "city": "city", "temperature": "temperature", "feels_like": "feels_like", "humidity": "humidity",
+        "description": "description", "wind_speed": "wind_speed", "recorded_at": "recorded_at"
+    }),
+}
+
+def _db_columns(kind: str, columns: dict):
+    model, mapping = DB_TARGETS[kind]
+    names = list(mapping)
+    values = [_as_python(columns[source]) for source in mapping.values()]
+    if hasattr(model, "synced_at"):
+        synced_at = datetime.utcnow()
+        names.append("synced_at")
+        values.append([synced_at] * len(values[0]))
+    if hasattr(model, "tenant_id"):
+        # COPY and raw executemany bypass the column default, so the tenant is written explicitly.
+        names.append("tenant_id")
+        values.append([current_tenant.get()] * len(values[0]))
+    return model, names, values
+
+def _copy_rows(db, table: str, names: list, values: list):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(zip(*values))
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    cursor.copy_expert(f"COPY {table} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+def write_chunk(db, kind: str, columns: dict):
+    model, names, values = _db_columns(kind, columns)
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        _copy_rows(db, model.__tablename__, names, values)
+    elif dialect == "sqlite":
+        # Plain executemany on positional tuples skips per-row parameter dict handling.
+        placeholders = ", ".join("?" for _ in names)
+        db.connection().exec_driver_sql(
+            f"INSERT INTO {model.__tablename__} ({', '.join(names)}) VALUES ({placeholders})",
+            list(zip(*values))
+        )
+    else:
+        db.execute(insert(model.__table__), [dict(zip(names, row)) for row in zip(*values)])
+    return len(values[0])
+
+def load(kind: str, count: int, seed: int = None, start: int = 0, chunk_size: int = MOCK_CHUNK_SIZE, distributions: dict = None, tenant: str = None):
+    written = 0
+    with tenant_scope(tenant or current_tenant.get()), SessionLocal() as db:
+        for columns in iter_chunks(kind, count, seed=seed, start=start, chunk_size=chunk_size, distributions=distributions):
+            written += write_chunk(db, kind, columns)
+            db.commit()
+        # Bulk loads skip the incremental ingest path, so derived tables are rebuilt once at the end.
+        rollup_source = {"orders": "orders", "stripe_payments": "stripe"}.get(kind)
+        if rollup_source in ROLLUP_SOURCES:
+            rebuild_rollups(db, rollup_source)
+        if kind == "weather":
+            rebuild_weather(db)
+        if kind == "github_issues":
+            rebuild_labels(db)
+        bump_data_version(db)
+        db.commit()
+    return written
+
+def write_file(path: str, kind: str, count: int, seed: int = None, start: int = 0, chunk_size: int = MOCK_CHUNK_SIZE, distributions: dict = None):
+    written = 0
+    ndjson = path.endswith((".ndjson", ".jsonl"))
+    with open(path, "w", newline="") as out:
+        writer = csv.writer(out)
+        for index, columns in enumerate(iter_chunks(kind, count, seed=seed, start=start, chunk_size=chunk_size, distributions=distributions)):
+            records = to_records(columns)
+            if ndjson:
+                out.write("".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records))
+            else:
+                if index == 0:
+                    writer.writerow(columns)
+                writer.writerows(record.values() for record in records)
+            written += len(records)
+    return written
+
+def _parse_distribution(value: str):
+    # field=a:1,b:3 for categorical weights, field=uniform:10:500 for numeric ranges
+    field, _, spec = value.partition("=")
+    parts = spec.split(",")
+    if len(parts) == 1 and parts[0].split(":")[0] in ("uniform", "normal", "lognormal", "integers"):
+        distribution, a, b = parts[0].split(":")
+        cast = int if distribution == "integers" else float
+        return field, (distribution, cast(a), cast(b))
+    return field, {choice: float(weight) for choice, weight in (part.rsplit(":", 1) for part in parts)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate seeded mock datasets for load testing")
+    parser.add_argument("kind", choices=sorted(GENERATORS))
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--start", type=int, default=0, help="row offset; IDs are derived from it")
+    parser.add_argument("--chunk-size", type=int, default=MOCK_CHUNK_SIZE)
+    parser.add_argument("--distribution", action="append", default=[], help="override, e.g. status=completed:9,pending:1 or amount=lognormal:5:1")
+    parser.add_argument("--out", help="write CSV (or NDJSON for .ndjson/.jsonl) instead of loading the database")
+    parser.add_argument("--tenant", help="tenant to load into (default DEFAULT_TENANT)")
+    args = parser.parse_args(argv)
+
+    distributions = dict(_parse_distribution(value) for value in args.distribution)
+    started = time.perf_counter()
+    if args.out:
+        written = write_file(args.out, args.kind, args.count, args.seed, args.start, args.chunk_size, distributions)
+        target = args.out
+    else:
+        Base.metadata.create_all(bind=engine)
+        ensure_search_index(engine)
+        written = load(args.kind, args.count, args.seed, args.start, args.chunk_size, distributions, tenant=args.tenant)
+        target = "database"
+    elapsed = time.perf_counter() - started
+    print(f"{args.kind}: wrote {written} rows to {target} in {elapsed:.2f}s ({written / max(elapsed, 1e-9):,.0f} rows/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
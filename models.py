@@ -1,6 +1,7 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, Enum, Index, UniqueConstraint
 from database import Base
+from tenancy import TenantScoped, tenant_table_args, current_tenant
 import enum
 
 class OrderStatus(str, enum.Enum):
@@ -9,11 +10,16 @@ class OrderStatus(str, enum.Enum):
     CANCELLED = "cancelled"
     PROCESSING = "processing"
 
-class Order(Base):
+class Order(TenantScoped, Base):
     __tablename__ = "orders"
+    __table_args__ = tenant_table_args(
+        Index("uq_orders_tenant_external_id", "tenant_id", "external_id", unique=True),
+        Index("ix_orders_tenant_status_created_at_id", "tenant_id", "status", "created_at", "id"),
+        Index("ix_orders_tenant_created_at_id", "tenant_id", "created_at", "id"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    external_id = Column(String(100), unique=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    external_id = Column(String(100))
     customer_name = Column(String(255))
     status = Column(String(50), default="pending")
     amount = Column(Float)
@@ -21,11 +27,14 @@ class Order(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     synced_at = Column(DateTime, default=datetime.utcnow)
 
-class Customer(Base):
+class Customer(TenantScoped, Base):
     __tablename__ = "customers"
+    __table_args__ = tenant_table_args(
+        Index("uq_customers_tenant_external_id", "tenant_id", "external_id", unique=True),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    external_id = Column(String(100), unique=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    external_id = Column(String(100))
     name = Column(String(255))
     email = Column(String(255))
     company = Column(String(255))
@@ -33,48 +42,93 @@ class Customer(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     synced_at = Column(DateTime, default=datetime.utcnow)
 
-class Event(Base):
+class Event(TenantScoped, Base):
     __tablename__ = "events"
+    __table_args__ = tenant_table_args(
+        Index("uq_events_tenant_external_id", "tenant_id", "external_id", unique=True),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    external_id = Column(String(100), unique=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    external_id = Column(String(100))
     event_type = Column(String(100))
     description = Column(Text)
     source = Column(String(50), default="mock_saas")
     created_at = Column(DateTime, default=datetime.utcnow)
     synced_at = Column(DateTime, default=datetime.utcnow)
 
-class StripePayment(Base):
+class StripePayment(TenantScoped, Base):
     __tablename__ = "stripe_payments"
+    __table_args__ = tenant_table_args(
+        Index("uq_stripe_payments_tenant_payment_id", "tenant_id", "payment_id", unique=True),
+        Index("ix_stripe_payments_tenant_created_at_id", "tenant_id", "created_at", "id"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    payment_id = Column(String(100), unique=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    payment_id = Column(String(100))
     amount = Column(Float)
     currency = Column(String(10))
     status = Column(String(50))
     customer_email = Column(String(255))
     description = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # When Stripe produced the state stored here; an older redelivered event never overwrites it.
+    source_updated_at = Column(DateTime)
     synced_at = Column(DateTime, default=datetime.utcnow)
 
-class GitHubIssue(Base):
+class GitHubIssue(TenantScoped, Base):
     __tablename__ = "github_issues"
+    __table_args__ = tenant_table_args(
+        Index("uq_github_issues_tenant_issue_id", "tenant_id", "issue_id", unique=True),
+        Index("ix_github_issues_tenant_created_at_id", "tenant_id", "created_at", "id"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    issue_id = Column(Integer, unique=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    issue_id = Column(Integer)
     title = Column(String(500))
     state = Column(String(50))
     author = Column(String(255))
     repository = Column(String(255))
     labels = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    source_updated_at = Column(DateTime)
     synced_at = Column(DateTime, default=datetime.utcnow)
 
-class WeatherData(Base):
+class Label(TenantScoped, Base):
+    __tablename__ = "labels"
+    __table_args__ = tenant_table_args(
+        Index("uq_labels_tenant_name", "tenant_id", "name", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    name = Column(String(255))
+
+class IssueLabel(TenantScoped, Base):
+    __tablename__ = "issue_labels"
+    __table_args__ = tenant_table_args(
+        Index("uq_issue_labels_tenant_issue_label", "tenant_id", "issue_id", "label_id", unique=True),
+        # Label pages walk this newest-first without touching github_issues.
+        Index("ix_issue_labels_tenant_label_created_at_issue", "tenant_id", "label_id", "created_at", "issue_id"),
+        # The per-label open/closed counts are read from this index alone.
+        Index("ix_issue_labels_tenant_label_state", "tenant_id", "label_id", "state"),
+        info={"derived": True},
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    # github_issues.id; created_at and state are copied from the issue so label lookups never read github_issues.
+    issue_id = Column(Integer)
+    label_id = Column(Integer)
+    state = Column(String(50))
+    created_at = Column(DateTime)
+
+class WeatherData(TenantScoped, Base):
     __tablename__ = "weather_data"
+    __table_args__ = tenant_table_args(
+        Index("ix_weather_data_tenant_city_recorded_at", "tenant_id", "city", "recorded_at"),
+        Index("ix_weather_data_tenant_recorded_at", "tenant_id", "recorded_at"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    city = Column(String(100), index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    city = Column(String(100))
     temperature = Column(Float)
     feels_like = Column(Float)
     humidity = Column(Integer)
@@ -83,22 +137,136 @@ class WeatherData(Base):
     recorded_at = Column(DateTime, default=datetime.utcnow)
     synced_at = Column(DateTime, default=datetime.utcnow)
 
-class SyncLog(Base):
+class WeatherLatest(TenantScoped, Base):
+    __tablename__ = "weather_latest"
+    __table_args__ = tenant_table_args(
+        UniqueConstraint("tenant_id", "city", name="uq_weather_latest_tenant_city"),
+        info={"derived": True},
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    city = Column(String(100))
+    temperature = Column(Float)
+    feels_like = Column(Float)
+    humidity = Column(Integer)
+    description = Column(String(255))
+    wind_speed = Column(Float)
+    recorded_at = Column(DateTime)
+
+class WeatherRollup(TenantScoped, Base):
+    __tablename__ = "weather_rollups"
+    __table_args__ = tenant_table_args(
+        UniqueConstraint("tenant_id", "city", "granularity", "bucket_start", name="uq_weather_rollups_tenant_city_granularity_bucket"),
+        Index("ix_weather_rollups_tenant_granularity_bucket_start", "tenant_id", "granularity", "bucket_start"),
+        info={"derived": True},
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    city = Column(String(100))
+    granularity = Column(String(10))
+    bucket_start = Column(DateTime)
+    readings = Column(Integer, default=0)
+    temperature_min = Column(Float)
+    temperature_max = Column(Float)
+    temperature_sum = Column(Float, default=0)
+    humidity_min = Column(Integer)
+    humidity_max = Column(Integer)
+    humidity_sum = Column(Float, default=0)
+    wind_speed_min = Column(Float)
+    wind_speed_max = Column(Float)
+    wind_speed_sum = Column(Float, default=0)
+
+class SyncLog(TenantScoped, Base):
     __tablename__ = "sync_logs"
+    __table_args__ = tenant_table_args(
+        Index("ix_sync_logs_tenant_synced_at", "tenant_id", "synced_at"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     source = Column(String(50))
     records_synced = Column(Integer)
     status = Column(String(50))
     synced_at = Column(DateTime, default=datetime.utcnow)
 
-class AuditLog(Base):
-    __tablename__ = "audit_logs"
+class SyncState(TenantScoped, Base):
+    __tablename__ = "sync_states"
+    __table_args__ = (
+        Index("uq_sync_states_tenant_source", "tenant_id", "source", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    source = Column(String(50))
+    status = Column(String(50), default="idle")
+    cursor = Column(Text)
+    pages = Column(Integer, default=0)
+    records_processed = Column(Integer, default=0)
+    high_water = Column(String(100))
+    etag = Column(String(255))
+    lock_job_id = Column(Integer)
+    lock_expires_at = Column(DateTime)
+    started_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DataVersion(TenantScoped, Base):
+    __tablename__ = "data_versions"
+    __table_args__ = (
+        Index("uq_data_versions_tenant", "tenant_id", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    # Bumped in the same transaction as every data write; caches in any worker compare against it.
+    version = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class SyncJob(Base):
+    __tablename__ = "sync_jobs"
+    __table_args__ = (
+        Index("ix_sync_jobs_status_run_after", "status", "run_after"),
+        Index("ix_sync_jobs_tenant_source_created_at", "tenant_id", "source", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
+    # Workers claim jobs across tenants, so jobs carry a tenant without being tenant-scoped.
+    tenant_id = Column(String(64), nullable=False, default=lambda: current_tenant.get())
+    source = Column(String(50))
+    params = Column(Text)
+    status = Column(String(50), default="queued")
+    requested_by = Column(String(255))
+    attempts = Column(Integer, default=0)
+    result = Column(Text)
+    error = Column(Text)
+    locked_by = Column(String(100))
+    lease_expires_at = Column(DateTime)
+    run_after = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+class AuditLog(TenantScoped, Base):
+    __tablename__ = "audit_logs"
+    __table_args__ = tenant_table_args(
+        Index("ix_audit_logs_tenant_created_at", "tenant_id", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user = Column(String(255))
     action = Column(String(100))
     resource = Column(String(100))
     details = Column(Text)
     ip_address = Column(String(50))
     created_at = Column(DateTime, default=datetime.utcnow)
+
+class KPIRollup(TenantScoped, Base):
+    __tablename__ = "kpi_rollups"
+    __table_args__ = tenant_table_args(
+        UniqueConstraint("tenant_id", "source", "status", "day", name="uq_kpi_rollups_tenant_source_status_day"),
+        info={"derived": True},
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    source = Column(String(50))
+    status = Column(String(50))
+    day = Column(Date)
+    record_count = Column(Integer, default=0)
+    amount = Column(Float, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,82 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from fastapi import Request
+
+PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL", "30"))
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get("PAGE_CACHE_MAX_ENTRIES", "512"))
+
+class PageCache:
+    def __init__(self, ttl: float = PAGE_CACHE_TTL, max_entries: int = PAGE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def key(self, request: Request, user: dict):
+        # Pages render the signed-in user's name and role-gated controls.
+        return (
+            request.url.path,
+            tuple(sorted(request.query_params.multi_items())),
+            user.get("tenant"),
+            user.get("role"),
+            user.get("sub"),
+        )
+
+    def etag(self, key, version: int):
+        # Built from the shared data version, so every worker hands out and accepts the same tag without rendering.
+        return f'W/"{version}-{hashlib.sha1(repr(key).encode()).hexdigest()[:16]}"'
+
+    def get(self, key, version: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["version"] != version or entry["expires_at"] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body: bytes, version: int):
+        entry = {
+            "body": body,
+            "version": version,
+            "etag": self.etag(key, version),
+            "expires_at": time.monotonic() + self.ttl,
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+page_cache = PageCache()
+
+def etag_matches(request: Request, etag: str):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
@@ -0,0 +1,55 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import tuple_
+
+def encode_cursor(created_at: datetime, row_id: int):
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+def keyset_page(query, model, after: str = None, before: str = None, per_page: int = 20, columns: tuple = None):
+    # columns: a (created_at, id) pair to order on instead of the model's own, e.g. from a joined index table.
+    created_at, row_id = columns or (model.created_at, model.id)
+    key = tuple_(created_at, row_id)
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if after_key is None else None
+
+    if before_key is not None:
+        # Walk backwards from the cursor, then flip back to newest-first order.
+        rows = (
+            query.filter(key > tuple_(*before_key))
+            .order_by(created_at.asc(), row_id.asc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after_key is not None:
+            query = query.filter(key < tuple_(*after_key))
+        rows = (
+            query.order_by(created_at.desc(), row_id.desc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev = after_key is not None
+
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(items[-1].created_at, items[-1].id) if items and has_next else None,
+        "prev_cursor": encode_cursor(items[0].created_at, items[0].id) if items and has_prev else None,
+    }
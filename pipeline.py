@@ -0,0 +1,290 @@
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+
+from database import Database, replica_router
+from models import Order, StripePayment, GitHubIssue, SyncLog, SyncState
+from ingest import bulk_upsert, dialect_insert, newest_per_key
+from rollups import ROLLUP_TRACKED_FIELDS, apply_changes
+from labels import apply_issue_labels
+from weather_store import ingest_readings, compact_if_due
+from data_version import bump_data_version, data_versions
+from broadcast import metrics_broadcaster
+from integrations import iter_stripe_payments, iter_github_issues, fetch_stripe_payments, fetch_github_issues, fetch_weather_data
+from external_api import generate_mock_orders
+from audit import audit
+
+def data_changed():
+    replica_router.note_write()
+    data_versions.forget()
+    metrics_broadcaster.notify()
+
+def upstream_time(value: str):
+    # Stored naive in UTC, like every other timestamp in the schema.
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+def write_orders(db: Session, records: list):
+    stats = bulk_upsert(db, Order, "external_id", [
+        {
+            "external_id": order_data["id"],
+            "customer_name": order_data["customer_name"],
+            "status": order_data["status"],
+            "amount": order_data["amount"],
+            "source": "mock_saas"
+        }
+        for order_data in records
+    ], track=ROLLUP_TRACKED_FIELDS)
+    apply_changes(db, "orders", stats.pop("changes"))
+    stats.pop("stale")
+    bump_data_version(db)
+    return stats
+
+def write_stripe_payments(db: Session, records: list):
+    # Charges carry no modification time: a webhook event is as new as the event, a polled charge as new as the fetch.
+    fetched_at = datetime.utcnow()
+    stats = bulk_upsert(db, StripePayment, "payment_id", [
+        {
+            "payment_id": payment_data["payment_id"],
+            "amount": payment_data["amount"],
+            "currency": payment_data["currency"],
+            "status": payment_data["status"],
+            "customer_email": payment_data["customer_email"],
+            "description": payment_data["description"],
+            "source_updated_at": upstream_time(payment_data.get("updated_at")) or fetched_at
+        }
+        for payment_data in records
+    ], track=ROLLUP_TRACKED_FIELDS, version="source_updated_at")
+    apply_changes(db, "stripe", stats.pop("changes"))
+    stats.pop("stale")
+    bump_data_version(db)
+    return stats
+
+def write_github_issues(db: Session, records: list):
+    records = [{**issue_data, "source_updated_at": upstream_time(issue_data.get("updated_at"))} for issue_data in records]
+    stats = bulk_upsert(db, GitHubIssue, "issue_id", [
+        {
+            "issue_id": issue_data["issue_id"],
+            "title": issue_data["title"],
+            "state": issue_data["state"],
+            "author": issue_data["author"],
+            "repository": issue_data["repository"],
+            "labels": issue_data["labels"],
+            "source_updated_at": issue_data["source_updated_at"]
+        }
+        for issue_data in records
+    ], version="source_updated_at")
+    stats.pop("changes")
+    stale = set(stats.pop("stale"))
+    # Labels follow the same version of each issue that the upsert kept.
+    latest = newest_per_key(records, "issue_id", "source_updated_at")
+    apply_issue_labels(db, [issue_data for issue_id, issue_data in latest.items() if issue_id not in stale])
+    bump_data_version(db)
+    return stats
+
+def write_weather(db: Session, records: list):
+    stats = ingest_readings(db, records)
+    bump_data_version(db)
+    return stats
+
+def sync_status(result: dict):
+    if result.get("fallback"):
+        return "fallback"
+    if result.get("partial"):
+        return "partial"
+    return "success"
+
+def record_sync(db: Session, source: str, stats: dict, status: str = "success"):
+    synced = stats["inserted"] + stats["updated"]
+    db.add(SyncLog(source=source, records_synced=synced, status=status))
+    return synced
+
+def get_sync_state(db: Session, source: str):
+    state = db.query(SyncState).filter(SyncState.source == source).first()
+    if state is None:
+        # Workers can race to create the row; let the unique constraint pick one.
+        stmt = dialect_insert(db, SyncState)
+        if stmt is None:
+            db.add(SyncState(source=source, status="idle", pages=0, records_processed=0))
+            db.flush()
+        else:
+            db.execute(stmt.values(source=source, status="idle", pages=0, records_processed=0).on_conflict_do_nothing(index_elements=["tenant_id", "source"]))
+        state = db.query(SyncState).filter(SyncState.source == source).one()
+    return state
+
+WATERMARK_FIELDS = {
+    "stripe": "created",
+    "github": "updated_at",
+}
+
+def advance_watermark(state: SyncState, records: list, etag: str = None):
+    field = WATERMARK_FIELDS[state.source]
+    # Mock records carry no upstream timestamps, so they never move the watermark.
+    seen = [record[field] for record in records if record.get(field) is not None]
+    if seen:
+        newest = max(seen)
+        current = state.high_water
+        if state.source == "stripe":
+            if current is None or newest > int(current):
+                state.high_water = str(newest)
+        elif current is None or newest > current:
+            state.high_water = newest
+    if etag:
+        state.etag = etag
+
+# source -> (page iterator, the iterator's keyword for a saved cursor, writer)
+STREAM_SOURCES = {
+    "stripe": (iter_stripe_payments, "starting_after", write_stripe_payments),
+    "github": (iter_github_issues, "next_url", write_github_issues),
+}
+
+def begin_stream(db: Session, source: str, restart: bool):
+    state = get_sync_state(db, source)
+    if restart or state.status not in ("running", "interrupted"):
+        state.cursor = None
+        state.pages = 0
+        state.records_processed = 0
+        state.started_at = datetime.utcnow()
+    state.status = "running"
+    db.commit()
+    return state.cursor
+
+def store_stream_chunk(db: Session, source: str, records: list, cursor: str):
+    write = STREAM_SOURCES[source][2]
+    state = get_sync_state(db, source)
+    stats = write(db, records)
+    advance_watermark(state, records)
+    # The chunk and its cursor commit together so a crash resumes after the last stored page.
+    state.cursor = cursor
+    state.pages += 1
+    state.records_processed += len(records)
+    db.commit()
+    return stats
+
+def interrupt_stream(db: Session, source: str):
+    db.rollback()
+    get_sync_state(db, source).status = "interrupted"
+    db.commit()
+
+def finish_stream(db: Session, source: str, totals: dict):
+    state = get_sync_state(db, source)
+    state.status = "complete"
+    state.cursor = None
+    record_sync(db, source, totals)
+    db.commit()
+    return {"pages": state.pages, "records_processed": state.records_processed}
+
+async def stream_sync(db: Database, source: str, restart: bool = False):
+    iterate, cursor_param, _ = STREAM_SOURCES[source]
+    cursor = await db.run(begin_stream, source, restart)
+
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0, "elapsed_ms": 0.0}
+    try:
+        async for records, cursor in iterate(**{cursor_param: cursor}):
+            stats = await db.run(store_stream_chunk, source, records, cursor)
+            for key in totals:
+                totals[key] += stats[key]
+            data_changed()
+    except Exception:
+        await db.run(interrupt_stream, source)
+        raise
+
+    totals["elapsed_ms"] = round(totals["elapsed_ms"], 2)
+    progress = await db.run(finish_stream, source, totals)
+    data_changed()
+    return totals, progress
+
+def store_orders(db: Session, records: list):
+    stats = write_orders(db, records)
+    synced = record_sync(db, "mock_saas", stats)
+    db.commit()
+    return synced, stats
+
+async def sync_orders(db: Database, requested_by: str = None):
+    synced, stats = await db.run(store_orders, generate_mock_orders())
+    data_changed()
+    
+    return {"synced": synced, "source": "mock_saas", **stats}
+
+def sync_high_water(db: Session, source: str):
+    state = get_sync_state(db, source)
+    db.commit()
+    return state.high_water, state.etag
+
+def store_stripe_payments(db: Session, records: list, status: str = "success"):
+    stats = write_stripe_payments(db, records)
+    advance_watermark(get_sync_state(db, "stripe"), records)
+    synced = record_sync(db, "stripe", stats, status)
+    db.commit()
+    return synced, stats
+
+async def sync_stripe(db: Database, requested_by: str = None):
+    high_water, _ = await db.run(sync_high_water, "stripe")
+    result = await fetch_stripe_payments(created_after=int(high_water) if high_water else None)
+    
+    synced, stats = await db.run(store_stripe_payments, result.get("data", []), sync_status(result))
+    data_changed()
+    
+    return {"synced": synced, "source": result.get("source"), "live": result.get("live"), "fallback": result.get("fallback"), **stats}
+
+def store_github_issues(db: Session, records: list, etag: str = None, status: str = "success"):
+    stats = write_github_issues(db, records)
+    advance_watermark(get_sync_state(db, "github"), records, etag=etag)
+    synced = record_sync(db, "github", stats, status)
+    db.commit()
+    return synced, stats
+
+async def sync_github(db: Database, requested_by: str = None):
+    high_water, etag = await db.run(sync_high_water, "github")
+    result = await fetch_github_issues(since=high_water, etag=etag)
+    
+    synced, stats = await db.run(store_github_issues, result.get("data", []), etag=result.get("etag"), status=sync_status(result))
+    data_changed()
+    
+    return {"synced": synced, "source": result.get("source"), "live": result.get("live"), "fallback": result.get("fallback"), "not_modified": result.get("not_modified", False), **stats}
+
+def store_weather(db: Session, records: list, status: str = "success"):
+    stats = write_weather(db, records)
+    synced = record_sync(db, "openweather", stats, status)
+    db.commit()
+    compact_if_due(db)
+    db.commit()
+    return synced, stats
+
+async def sync_weather(db: Database, requested_by: str = None):
+    result = await fetch_weather_data()
+    
+    synced, stats = await db.run(store_weather, result.get("data", []), sync_status(result))
+    data_changed()
+    
+    return {"synced": synced, "source": result.get("source"), "live": result.get("live"), "fallback": result.get("fallback"), "partial": result.get("partial", False), "partial_reason": result.get("partial_reason"), "failed_cities": result.get("failed_cities", []), **stats}
+
+SYNC_RUNNERS = {
+    "orders": sync_orders,
+    "stripe": sync_stripe,
+    "github": sync_github,
+    "weather": sync_weather,
+}
+
+async def run_sync(db: Database, source: str, params: dict = None, requested_by: str = None):
+    params = params or {}
+    if params.get("mode") == "backfill":
+        stats, progress = await stream_sync(db, source, restart=params.get("restart", False))
+        result = {
+            "synced": stats["inserted"] + stats["updated"],
+            "source": source,
+            **progress,
+            **stats
+        }
+        action = "backfill"
+    else:
+        result = await SYNC_RUNNERS[source](db, requested_by)
+        action = "sync"
+    details = f"Synced {result['synced']} {source} records from {result['source']}"
+    if result.get("fallback"):
+        details += f" (live source unavailable: {result['fallback']})"
+    elif result.get("partial"):
+        details += f" (partial: {', '.join(result['failed_cities'])} unavailable: {result['partial_reason']})"
+    await audit(requested_by, action, source, details=details)
+    return result
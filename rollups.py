@@ -0,0 +1,170 @@
+import sys
+import argparse
+from collections import defaultdict
+from datetime import datetime, date
+from sqlalchemy import select, delete, update, insert, func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, engine, Base
+from models import Order, StripePayment, KPIRollup
+from ingest import dialect_insert
+from tenancy import tenant_scope, tenant_ids
+
+ROLLUP_SOURCES = {
+    "orders": Order,
+    "stripe": StripePayment,
+}
+
+ROLLUP_TRACKED_FIELDS = ("status", "amount", "created_at")
+
+AMOUNT_TOLERANCE = 0.01
+
+def _as_date(value):
+    if value is None:
+        return datetime.utcnow().date()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def apply_changes(db: Session, source: str, changes: list):
+    deltas = defaultdict(lambda: [0, 0.0])
+    for before, after in changes:
+        if before is not None:
+            delta = deltas[(before["status"], _as_date(before["created_at"]))]
+            delta[0] -= 1
+            delta[1] -= before["amount"] or 0
+        if after is not None:
+            delta = deltas[(after["status"], _as_date(after["created_at"]))]
+            delta[0] += 1
+            delta[1] += after["amount"] or 0
+
+    now = datetime.utcnow()
+    rows = [
+        {"source": source, "status": status, "day": day, "record_count": count, "amount": amount, "updated_at": now}
+        for (status, day), (count, amount) in deltas.items()
+        if count or abs(amount) >= AMOUNT_TOLERANCE / 2
+    ]
+    if not rows:
+        return 0
+
+    stmt = dialect_insert(db, KPIRollup)
+    if stmt is not None:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tenant_id", "source", "status", "day"],
+            set_={
+                "record_count": KPIRollup.record_count + stmt.excluded.record_count,
+                "amount": KPIRollup.amount + stmt.excluded.amount,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.execute(stmt, rows)
+        return len(rows)
+
+    for row in rows:
+        result = db.execute(
+            update(KPIRollup)
+            .where(KPIRollup.source == source, KPIRollup.status == row["status"], KPIRollup.day == row["day"])
+            .values(
+                record_count=KPIRollup.record_count + row["record_count"],
+                amount=KPIRollup.amount + row["amount"],
+                updated_at=now,
+            )
+        )
+        if result.rowcount == 0:
+            db.execute(insert(KPIRollup).values(**row))
+    return len(rows)
+
+def rollup_totals(db: Session, source: str):
+    rows = db.execute(
+        select(KPIRollup.status, func.sum(KPIRollup.record_count), func.sum(KPIRollup.amount))
+        .where(KPIRollup.source == source)
+        .group_by(KPIRollup.status)
+    )
+    return {status: (count or 0, amount or 0) for status, count, amount in rows}
+
+def compute_from_base(db: Session, source: str):
+    model = ROLLUP_SOURCES[source]
+    day = func.date(model.created_at)
+    rows = db.execute(
+        select(model.status, day, func.count(model.id), func.coalesce(func.sum(model.amount), 0))
+        .group_by(model.status, day)
+    )
+    return {(status, _as_date(day)): (count, amount) for status, day, count, amount in rows}
+
+def rebuild(db: Session, source: str):
+    expected = compute_from_base(db, source)
+    db.execute(delete(KPIRollup).where(KPIRollup.source == source))
+    now = datetime.utcnow()
+    rows = [
+        {"source": source, "status": status, "day": day, "record_count": count, "amount": amount, "updated_at": now}
+        for (status, day), (count, amount) in expected.items()
+    ]
+    if rows:
+        db.execute(insert(KPIRollup), rows)
+    return len(rows)
+
+def check(db: Session, source: str):
+    expected = compute_from_base(db, source)
+    actual = {
+        (status, _as_date(day)): (count, amount)
+        for status, day, count, amount in db.execute(
+            select(KPIRollup.status, KPIRollup.day, KPIRollup.record_count, KPIRollup.amount)
+            .where(KPIRollup.source == source)
+        )
+    }
+
+    drift = []
+    for key in sorted(set(expected) | set(actual), key=lambda k: (str(k[0]), k[1])):
+        expected_count, expected_amount = expected.get(key, (0, 0))
+        actual_count, actual_amount = actual.get(key, (0, 0))
+        if expected_count != actual_count or abs(expected_amount - actual_amount) > AMOUNT_TOLERANCE:
+            drift.append({
+                "source": source,
+                "status": key[0],
+                "day": key[1].isoformat(),
+                "expected_count": expected_count,
+                "actual_count": actual_count,
+                "expected_amount": round(expected_amount, 2),
+                "actual_amount": round(actual_amount, 2),
+            })
+    return drift
+
+def ensure_rollups(db: Session):
+    for source, model in ROLLUP_SOURCES.items():
+        for tenant in tenant_ids(db, model):
+            with tenant_scope(tenant):
+                has_rollups = db.execute(select(select(KPIRollup.id).where(KPIRollup.source == source).exists())).scalar()
+                has_rows = db.execute(select(select(model.id).exists())).scalar()
+                if has_rows and not has_rollups:
+                    rebuild(db, source)
+    db.commit()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the KPI rollup tables")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--source", choices=sorted(ROLLUP_SOURCES), action="append")
+    parser.add_argument("--tenant", action="append", help="defaults to every tenant with data")
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    sources = args.source or sorted(ROLLUP_SOURCES)
+    with SessionLocal() as db:
+        drifted = False
+        for source in sources:
+            for tenant in args.tenant or tenant_ids(db, ROLLUP_SOURCES[source]):
+                with tenant_scope(tenant):
+                    if args.command == "rebuild":
+                        print(f"{tenant}/{source}: rebuilt {rebuild(db, source)} rollup rows")
+                        continue
+                    drift = check(db, source)
+                    drifted = drifted or bool(drift)
+                    print(f"{tenant}/{source}: {len(drift)} drifted rollup rows")
+                    for entry in drift:
+                        print(f"  {entry}")
+        db.commit()
+        return 1 if drifted else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
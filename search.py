@@ -0,0 +1,251 @@
+import re
+import sys
+import json
+import base64
+import logging
+import binascii
+import argparse
+from collections import defaultdict
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from database import engine, replica_engine, Base
+from models import Order, Event, StripePayment, GitHubIssue
+from tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_MAX_TERMS = 8
+
+# source -> (model, indexed text columns, columns returned with each hit)
+SEARCH_SOURCES = {
+    "orders": (Order, ("customer_name",), ("external_id", "customer_name", "status", "amount")),
+    "payments": (StripePayment, ("description", "customer_email"), ("payment_id", "customer_email", "description", "amount", "currency", "status")),
+    "issues": (GitHubIssue, ("title",), ("issue_id", "title", "state", "author", "repository")),
+    "events": (Event, ("description",), ("external_id", "event_type", "description")),
+}
+
+SEARCH_DIALECTS = ("sqlite", "postgresql")
+
+def search_supported(bind=engine):
+    return bind.dialect.name in SEARCH_DIALECTS
+
+def search_terms(query: str):
+    # Letters and digits only, so user input can never reach the FTS5 / tsquery syntax; a trailing * asks for a prefix match.
+    return [
+        (term, prefix == "*")
+        for term, prefix in re.findall(r"([^\W_]+)(\*?)", (query or "").lower())
+    ][:SEARCH_MAX_TERMS]
+
+def _fts_table(model):
+    return f"{model.__tablename__}_fts"
+
+def _pg_index(model):
+    return f"ix_{model.__tablename__}_search"
+
+def _pg_document(fields: tuple):
+    # Punctuation becomes whitespace so e-mail addresses split into words the same way FTS5's unicode61 tokenizer does.
+    joined = " || ' ' || ".join(f"coalesce({field}, '')" for field in fields)
+    return f"to_tsvector('simple', regexp_replace({joined}, '[^[:alnum:]]+', ' ', 'g'))"
+
+def _sqlite_index_ddl(model, fields: tuple):
+    table, fts = model.__tablename__, _fts_table(model)
+    columns = ", ".join(fields)
+    new_values = ", ".join(f"new.{field}" for field in fields)
+    old_values = ", ".join(f"old.{field}" for field in fields)
+    # External-content FTS5 table: the text stays in the base table and triggers keep the index in step with every write.
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+def ensure_search_index(bind=engine):
+    dialect = bind.dialect.name
+    with bind.begin() as conn:
+        for model, fields, _ in SEARCH_SOURCES.values():
+            if dialect == "sqlite":
+                # Triggers go away with their table, so a base table that was dropped and recreated gets a fresh index.
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"), {"name": f"{_fts_table(model)}_ai"}
+                ).scalar()
+                if not exists:
+                    conn.execute(text(f"DROP TABLE IF EXISTS {_fts_table(model)}"))
+                    for statement in _sqlite_index_ddl(model, fields):
+                        conn.execute(text(statement))
+            elif dialect == "postgresql":
+                # An expression index is maintained by Postgres on every insert/update, with no extra column to carry around.
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {_pg_index(model)} ON {model.__tablename__} USING GIN ({_pg_document(fields)})"
+                ))
+
+def search_index_exists(bind=engine):
+    with bind.connect() as conn:
+        for model, _, _ in SEARCH_SOURCES.values():
+            if bind.dialect.name == "sqlite":
+                found = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"), {"name": f"{_fts_table(model)}_ai"}
+                ).scalar()
+            else:
+                found = conn.execute(text("SELECT to_regclass(:name)"), {"name": _pg_index(model)}).scalar()
+            if not found:
+                return False
+    return True
+
+def ensure_replica_search_index():
+    # Search reads the replica only when its index is there. A streaming standby is read-only and gets the
+    # index through replication; any other replica builds its own.
+    if replica_engine is None or not search_supported(replica_engine):
+        return False
+    try:
+        ensure_search_index(replica_engine)
+    except Exception:
+        logger.info("Could not build the search index on the replica; checking for a replicated one", exc_info=True)
+    try:
+        return search_index_exists(replica_engine)
+    except Exception:
+        logger.warning("Replica search index check failed; search reads the primary", exc_info=True)
+        return False
+
+def encode_cursor(score: float, source: str, row_id: int):
+    raw = json.dumps([score, source, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        score, source, row_id = json.loads(raw)
+        return float(score), str(source), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+def _after_cursor(source: str, cursor):
+    # Hits are ordered by (score DESC, source, id DESC); the source name is fixed within each subquery.
+    if cursor is None:
+        return ""
+    _, after_source, _ = cursor
+    if source > after_source:
+        return "WHERE score <= :after_score"
+    if source < after_source:
+        return "WHERE score < :after_score"
+    return "WHERE score < :after_score OR (score = :after_score AND id < :after_id)"
+
+def _sqlite_hits(source: str, model, fields: tuple, cursor):
+    table, fts = model.__tablename__, _fts_table(model)
+    return (
+        f"SELECT * FROM (SELECT '{source}' AS source, id, score FROM ("
+        f"SELECT {fts}.rowid AS id, -bm25({fts}) AS score FROM {fts} JOIN {table} ON {table}.id = {fts}.rowid "
+        f"WHERE {fts} MATCH :match AND {table}.tenant_id = :tenant"
+        f") AS {source}_ranked {_after_cursor(source, cursor)} ORDER BY score DESC, id DESC LIMIT :limit) AS {source}_hits"
+    )
+
+def _pg_hits(source: str, model, fields: tuple, cursor):
+    document = _pg_document(fields)
+    return (
+        f"SELECT * FROM (SELECT '{source}' AS source, id, score FROM ("
+        f"SELECT id, ts_rank({document}, to_tsquery('simple', :match)) AS score FROM {model.__tablename__} "
+        f"WHERE tenant_id = :tenant AND {document} @@ to_tsquery('simple', :match)"
+        f") AS {source}_ranked {_after_cursor(source, cursor)} ORDER BY score DESC, id DESC LIMIT :limit) AS {source}_hits"
+    )
+
+def _match_expression(dialect: str, terms: list):
+    # Every term must match. Prefix terms expand to every indexed word they start, so they are opt-in.
+    if dialect == "postgresql":
+        return " & ".join(term + (":*" if prefix else "") for term, prefix in terms)
+    return " ".join(f'"{term}"' + ("*" if prefix else "") for term, prefix in terms)
+
+def _hit_fields(source: str, row):
+    fields = SEARCH_SOURCES[source][2]
+    return {
+        "source": source,
+        "id": row.id,
+        **{field: getattr(row, field) for field in fields},
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
+
+def search(db: Session, query: str, sources: list = None, limit: int = SEARCH_PAGE_SIZE, cursor: str = None):
+    terms = search_terms(query)
+    if not terms:
+        return {"results": [], "next_cursor": None}
+    after = decode_cursor(cursor)
+    dialect = db.get_bind().dialect.name
+    hits_sql = _pg_hits if dialect == "postgresql" else _sqlite_hits
+    # Every source ranks all of its matches and contributes its best page; the merge below keeps the best of those.
+    parts = [hits_sql(source, *SEARCH_SOURCES[source][:2], after) for source in sources or SEARCH_SOURCES]
+    statement = text(" UNION ALL ".join(parts) + " ORDER BY score DESC, source, id DESC LIMIT :limit")
+    # Raw SQL skips the session's automatic tenant scoping, so the tenant is bound explicitly.
+    params = {
+        "match": _match_expression(dialect, terms),
+        "tenant": current_tenant.get(),
+        "limit": limit + 1,
+    }
+    if after is not None:
+        params["after_score"], _, params["after_id"] = after
+    hits = db.execute(statement, params).all()
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+
+    ids = defaultdict(list)
+    for source, row_id, _ in hits:
+        ids[source].append(row_id)
+    rows = {}
+    for source, row_ids in ids.items():
+        model = SEARCH_SOURCES[source][0]
+        # The hits are already tenant-filtered; the extra tenant predicate would steer SQLite off the primary key.
+        query = select(model).where(model.id.in_(row_ids)).execution_options(all_tenants=True)
+        for row in db.execute(query).scalars():
+            rows[(source, row.id)] = row
+
+    results = []
+    for source, row_id, score in hits:
+        row = rows.get((source, row_id))
+        if row is not None:
+            results.append({**_hit_fields(source, row), "rank": round(score, 6)})
+    next_cursor = encode_cursor(hits[-1].score, hits[-1].source, hits[-1].id) if has_more else None
+    return {"results": results, "next_cursor": next_cursor}
+
+def rebuild(bind=engine):
+    ensure_search_index(bind)
+    with bind.begin() as conn:
+        for model, _, _ in SEARCH_SOURCES.values():
+            if bind.dialect.name == "sqlite":
+                conn.execute(text(f"INSERT INTO {_fts_table(model)}({_fts_table(model)}) VALUES ('rebuild')"))
+            else:
+                conn.execute(text(f"REINDEX INDEX {_pg_index(model)}"))
+
+def optimize(bind=engine):
+    # Merges FTS5 segments / flushes the GIN pending list; worth running after a large bulk load.
+    ensure_search_index(bind)
+    with bind.begin() as conn:
+        for model, _, _ in SEARCH_SOURCES.values():
+            if bind.dialect.name == "sqlite":
+                conn.execute(text(f"INSERT INTO {_fts_table(model)}({_fts_table(model)}) VALUES ('optimize')"))
+            else:
+                conn.execute(text(f"SELECT gin_clean_pending_list('{_pg_index(model)}'::regclass)"))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the full-text search index")
+    parser.add_argument("command", choices=["rebuild", "optimize"])
+    args = parser.parse_args(argv)
+
+    if not search_supported():
+        print(f"Full-text search is not supported on {engine.dialect.name}")
+        return 1
+    Base.metadata.create_all(bind=engine)
+    {"rebuild": rebuild, "optimize": optimize}[args.command]()
+    print(f"search index: {args.command} done for {', '.join(SEARCH_SOURCES)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import os
+import re
+import sys
+import argparse
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import Column, String, event, inspect, select, text
+from sqlalchemy.orm import Session, with_loader_criteria
+
+DEFAULT_TENANT = os.environ.get("DEFAULT_TENANT", "default")
+# Tenants the scheduler runs periodic syncs for.
+TENANTS = [tenant.strip() for tenant in os.environ.get("TENANTS", DEFAULT_TENANT).split(",") if tenant.strip()]
+# Postgres only: LIST-partition tenant tables by tenant_id. Takes effect when the tables are first created.
+TENANT_PARTITIONING = (
+    os.environ.get("TENANT_PARTITIONING", "false").lower() in ("1", "true", "yes")
+    and os.environ.get("DATABASE_URL", "").startswith("postgres")
+)
+# Large tenants listed here get a partition of their own; everyone else shares the default partition.
+TENANT_DEDICATED_PARTITIONS = [
+    tenant.strip() for tenant in os.environ.get("TENANT_DEDICATED_PARTITIONS", "").split(",") if tenant.strip()
+]
+
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+current_tenant = ContextVar("current_tenant", default=DEFAULT_TENANT)
+
+class TenantScoped:
+    tenant_id = Column(String(64), nullable=False, default=lambda: current_tenant.get(), primary_key=TENANT_PARTITIONING)
+
+def tenant_table_args(*args, **kwargs):
+    if TENANT_PARTITIONING:
+        kwargs["postgresql_partition_by"] = "LIST (tenant_id)"
+    return (*args, kwargs) if kwargs else args
+
+def valid_tenant(tenant: str):
+    return bool(tenant) and TENANT_ID_PATTERN.match(tenant) is not None
+
+@contextmanager
+def tenant_scope(tenant: str):
+    token = current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        current_tenant.reset(token)
+
+@event.listens_for(Session, "do_orm_execute")
+def _scope_to_tenant(state):
+    # Maintenance work that spans tenants opts out with execution_options(all_tenants=True).
+    if not (state.is_select or state.is_update or state.is_delete) or state.execution_options.get("all_tenants"):
+        return
+    tenant = current_tenant.get()
+    state.statement = state.statement.options(
+        with_loader_criteria(TenantScoped, lambda cls: cls.tenant_id == tenant, include_aliases=True)
+    )
+
+def tenant_ids(db: Session, model):
+    return db.execute(select(model.tenant_id).distinct().execution_options(all_tenants=True)).scalars().all()
+
+def ensure_tenant_schema(engine, metadata):
+    # Upgrades tables created before tenancy; existing rows belong to DEFAULT_TENANT.
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name not in existing or "tenant_id" not in table.c:
+            continue
+        if "tenant_id" in {column["name"] for column in inspector.get_columns(table.name)}:
+            continue
+        if table.info.get("derived"):
+            # Rebuilt from the base tables; dropping is simpler than rewriting their unique keys.
+            table.drop(bind=engine)
+            continue
+        declared = {index.name for index in table.indexes}
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN tenant_id VARCHAR(64) NOT NULL DEFAULT '{DEFAULT_TENANT}'"))
+            # Single-tenant unique keys would reject the same external id in two tenants.
+            for index in inspector.get_indexes(table.name):
+                if index["name"] not in declared:
+                    conn.execute(text(f"DROP INDEX {index['name']}"))
+
+def _partitioned_tables(metadata):
+    return [table for table in metadata.sorted_tables if table.dialect_kwargs.get("postgresql_partition_by")]
+
+def add_tenant_partition(conn, table: str, tenant: str):
+    partition = f"{table}_t_{tenant.lower().replace('-', '_')}"
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": partition}).scalar() is not None:
+        return False
+    # Rows already in the default partition move over before the new partition is attached.
+    conn.execute(text(f"CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(f"INSERT INTO {partition} SELECT * FROM {table}_default WHERE tenant_id = :tenant"), {"tenant": tenant})
+    conn.execute(text(f"DELETE FROM {table}_default WHERE tenant_id = :tenant"), {"tenant": tenant})
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES IN ('{tenant}')"))
+    return True
+
+def ensure_tenant_partitions(engine, metadata, dedicated: list = None):
+    if not TENANT_PARTITIONING:
+        return
+    with engine.begin() as conn:
+        for table in _partitioned_tables(metadata):
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table.name}_default PARTITION OF {table.name} DEFAULT"))
+            for tenant in TENANT_DEDICATED_PARTITIONS if dedicated is None else dedicated:
+                if valid_tenant(tenant):
+                    add_tenant_partition(conn, table.name, tenant)
+
+def main(argv=None):
+    from database import Base, engine
+    import models
+
+    parser = argparse.ArgumentParser(description="Manage per-tenant Postgres partitions")
+    parser.add_argument("command", choices=["partition"])
+    parser.add_argument("tenant")
+    args = parser.parse_args(argv)
+
+    if not TENANT_PARTITIONING:
+        print("TENANT_PARTITIONING is off (or the database is not PostgreSQL)")
+        return 1
+    if not valid_tenant(args.tenant):
+        print(f"Invalid tenant id {args.tenant!r}")
+        return 1
+    Base.metadata.create_all(bind=engine)
+    ensure_tenant_partitions(engine, Base.metadata, dedicated=[args.tenant])
+    print(f"{args.tenant}: dedicated partitions ready")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
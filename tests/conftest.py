@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# The app reads its configuration at import time, so the test databases are chosen before anything imports it:
+# two SQLite files standing in for a primary and its read replica.
+DATA_DIR = tempfile.mkdtemp(prefix="dashboard-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATA_DIR}/primary.db"
+os.environ["DATABASE_REPLICA_URL"] = f"sqlite:///{DATA_DIR}/replica.db"
@@ -0,0 +1,154 @@
+import asyncio
+
+import httpx
+import pytest
+
+import stubs
+import integrations
+from integrations import CircuitBreaker, IntegrationClient, IntegrationUnavailable
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = stubs.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    for name in ("STRIPE_API_BASE", "GITHUB_API_BASE", "OPENWEATHER_API_BASE"):
+        monkeypatch.setattr(integrations, name, base)
+    monkeypatch.setattr(integrations, "STRIPE_API_KEY", "sk_test_stub")
+    monkeypatch.setattr(integrations, "OPENWEATHER_API_KEY", "stub-key")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Records every backoff the client asks for; the sleep itself still happens.
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        return await real_sleep(delay, *args, **kwargs)
+
+    monkeypatch.setattr(integrations.asyncio, "sleep", sleep)
+    return delays
+
+def charges_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/v1/charges"
+
+def run(client, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await client.aclose()
+    return asyncio.run(main())
+
+def test_breaker_opens_probes_and_closes(stub):
+    client = IntegrationClient(max_retries=0)
+    breaker = client.breakers["stripe"] = CircuitBreaker(threshold=2, reset_timeout=0.2)
+    url = charges_url(stub)
+
+    async def scenario():
+        stubs.set_faults(stub, "503")
+        for _ in range(2):
+            assert (await client.get(url, integration="stripe")).status_code == 503
+        assert breaker.state == "open"
+        with pytest.raises(IntegrationUnavailable) as error:
+            await client.get(url, integration="stripe")
+        assert error.value.reason == "circuit_open"
+
+        await asyncio.sleep(0.25)
+        assert breaker.state == "half_open"
+        # A failed probe opens the circuit again for another reset_timeout.
+        assert (await client.get(url, integration="stripe")).status_code == 503
+        assert breaker.state == "open"
+
+        await asyncio.sleep(0.25)
+        stubs.set_faults(stub, None)
+        assert (await client.get(url, integration="stripe")).status_code == 200
+        assert breaker.state == "closed"
+        assert breaker.failures == 0
+
+    run(client, scenario)
+
+def test_5xx_retries_back_off_exponentially(stub, sleeps, monkeypatch):
+    monkeypatch.setattr(integrations, "HTTP_RETRY_BACKOFF", 0.05)
+    monkeypatch.setattr(integrations.random, "uniform", lambda low, high: 1.0)
+    client = IntegrationClient(max_retries=2)
+    stubs.set_faults(stub, "503")
+
+    response = run(client, lambda: client.get(charges_url(stub), integration="stripe"))
+
+    assert response.status_code == 503
+    assert sleeps == [0.05, 0.1]
+    assert client.breakers["stripe"].failures == 1
+
+def test_429_waits_for_retry_after(stub, sleeps):
+    client = IntegrationClient(max_retries=1)
+    stubs.set_faults(stub, "429", retry_after=1)
+
+    response = run(client, lambda: client.get(charges_url(stub), integration="stripe"))
+
+    assert response.status_code == 429
+    assert sleeps == [1.0]
+    # A 429 means the upstream is up; pacing is the rate limiter's job, not the breaker's.
+    assert client.breakers["stripe"].state == "closed"
+    assert client.breakers["stripe"].failures == 0
+
+def test_429_with_a_long_retry_after_fails_fast(stub, sleeps):
+    client = IntegrationClient(max_retries=2)
+    stubs.set_faults(stub, "429", retry_after=60)
+    url = charges_url(stub)
+
+    async def scenario():
+        assert (await client.get(url, integration="stripe")).status_code == 429
+        # Later calls are held back until the window passes instead of hitting the upstream again.
+        with pytest.raises(IntegrationUnavailable) as error:
+            await client.get(url, integration="stripe")
+        assert error.value.reason == "rate_limited"
+
+    run(client, scenario)
+    assert sleeps == []
+
+def test_hanging_endpoint_times_out_and_counts_as_failure(stub):
+    client = IntegrationClient(timeout=0.2, max_retries=2)
+    breaker = client.breakers["stripe"] = CircuitBreaker(threshold=2, reset_timeout=30)
+    stubs.set_faults(stub, "hang", hang=2)
+    url = charges_url(stub)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(httpx.ReadTimeout):
+                await client.get(url, integration="stripe")
+        assert breaker.state == "open"
+        with pytest.raises(IntegrationUnavailable):
+            await client.get(url, integration="stripe")
+
+    run(client, scenario)
+
+def test_hanging_stripe_falls_back_to_mock_data(stub, monkeypatch):
+    client = IntegrationClient(timeout=0.2)
+    monkeypatch.setattr(integrations, "http_client", client)
+    stubs.set_faults(stub, "hang", hang=2)
+
+    result = run(client, integrations._fetch_stripe_payments)
+
+    assert result["fallback"] == "timeout"
+    assert result["live"] is False
+    assert result["data"]
+
+def test_partial_weather_fetch_reports_failed_cities(stub, monkeypatch):
+    client = IntegrationClient(max_retries=0)
+    monkeypatch.setattr(integrations, "http_client", client)
+    cities = ["London", "New York", "Tokyo", "Sydney", "Paris"]
+    # The stub's seeded RNG fails two of these five requests.
+    stubs.set_faults(stub, "503", fault_rate=0.5)
+
+    result = run(client, lambda: integrations._fetch_weather_data(cities))
+
+    assert result["partial"] is True
+    assert result["partial_reason"] == "http_503"
+    assert result["live"] is True
+    assert "fallback" not in result
+    assert len(result["failed_cities"]) == 2
+    assert sorted(result["failed_cities"] + [reading["city"] for reading in result["data"]]) == sorted(cities)
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+import models
+from database import Base, ReplicaRouter, engine, replica_engine
+
+@pytest.fixture(autouse=True)
+def databases():
+    for bind in (engine, replica_engine):
+        Base.metadata.drop_all(bind=bind)
+        Base.metadata.create_all(bind=bind)
+    yield
+    for bind in (engine, replica_engine):
+        bind.dispose()
+
+def record_sync(bind, synced_at):
+    with bind.begin() as conn:
+        conn.execute(
+            models.SyncLog.__table__.insert(),
+            {"source": "orders", "records_synced": 1, "status": "success", "synced_at": synced_at, "tenant_id": "default"},
+        )
+
+def test_caught_up_replica_serves_reads():
+    now = datetime.utcnow()
+    record_sync(engine, now)
+    record_sync(replica_engine, now)
+    router = ReplicaRouter(max_lag=5, check_interval=0)
+
+    assert router.use_replica()
+    assert router.stats()["lag_seconds"] == 0
+    assert router.stats()["replica_reads"] == 1
+
+def test_lagging_replica_falls_back_to_primary():
+    now = datetime.utcnow()
+    record_sync(engine, now)
+    record_sync(replica_engine, now - timedelta(seconds=60))
+    router = ReplicaRouter(max_lag=5, check_interval=0)
+
+    assert not router.use_replica()
+    assert router.stats()["lag_seconds"] == pytest.approx(60)
+    assert router.stats()["primary_reads"] == 1
+
+    record_sync(replica_engine, now)
+    assert router.use_replica()
+
+def test_reads_after_a_write_go_to_the_primary():
+    now = datetime.utcnow()
+    record_sync(engine, now)
+    record_sync(replica_engine, now)
+    router = ReplicaRouter(max_lag=5, check_interval=0)
+    assert router.use_replica()
+
+    router.note_write()
+
+    assert not router.use_replica()
+    assert router.stats() == {"configured": True, "lag_seconds": 0.0, "replica_reads": 1, "primary_reads": 1}
+
+def test_write_window_ends_after_max_lag(monkeypatch):
+    now = datetime.utcnow()
+    record_sync(engine, now)
+    record_sync(replica_engine, now)
+    router = ReplicaRouter(max_lag=5, check_interval=0)
+    router.note_write()
+    assert not router.use_replica()
+
+    monkeypatch.setattr(router, "_last_write", router._last_write - 6)
+    assert router.use_replica()
+
+def test_failed_lag_check_reads_the_primary():
+    record_sync(engine, datetime.utcnow())
+    with replica_engine.begin() as conn:
+        conn.execute(text("DROP TABLE sync_logs"))
+    router = ReplicaRouter(max_lag=5, check_interval=0)
+
+    assert not router.use_replica()
+    assert router.stats()["lag_seconds"] is None
+    assert router.stats()["primary_reads"] == 1
+
+def test_lag_check_is_reused_within_the_interval():
+    now = datetime.utcnow()
+    record_sync(engine, now)
+    record_sync(replica_engine, now)
+    router = ReplicaRouter(max_lag=5, check_interval=60)
+    assert router.use_replica()
+
+    # The replica falls behind, but the last measurement stands until the interval passes.
+    record_sync(engine, now + timedelta(seconds=60))
+    assert router.use_replica()
@@ -0,0 +1,277 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, update, insert, func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, engine, Base
+from models import WeatherData, WeatherLatest, WeatherRollup
+from ingest import dialect_insert, bulk_insert
+from tenancy import tenant_scope, tenant_ids
+
+WEATHER_RAW_RETENTION_DAYS = int(os.environ.get("WEATHER_RAW_RETENTION_DAYS", "7"))
+WEATHER_HOURLY_RETENTION_DAYS = int(os.environ.get("WEATHER_HOURLY_RETENTION_DAYS", "90"))
+WEATHER_COMPACT_INTERVAL = float(os.environ.get("WEATHER_COMPACT_INTERVAL", "3600"))
+
+READING_FIELDS = ("temperature", "feels_like", "humidity", "description", "wind_speed")
+AGGREGATE_FIELDS = ("temperature", "humidity", "wind_speed")
+GRANULARITIES = {
+    "hour": lambda ts: ts.replace(minute=0, second=0, microsecond=0),
+    "day": lambda ts: ts.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+NEXT_BUCKET = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+_last_compacted = None
+
+def _recorded_at(record: dict, now: datetime):
+    value = record.get("recorded_at")
+    if value is None:
+        return now
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+
+def _bucket_rows(rows: list):
+    buckets = {}
+    for row in rows:
+        for granularity, truncate in GRANULARITIES.items():
+            key = (row["city"], granularity, truncate(row["recorded_at"]))
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {
+                    "city": key[0],
+                    "granularity": granularity,
+                    "bucket_start": key[2],
+                    "readings": 0,
+                }
+                for field in AGGREGATE_FIELDS:
+                    bucket[f"{field}_min"] = row[field]
+                    bucket[f"{field}_max"] = row[field]
+                    bucket[f"{field}_sum"] = 0
+            bucket["readings"] += 1
+            for field in AGGREGATE_FIELDS:
+                bucket[f"{field}_min"] = min(bucket[f"{field}_min"], row[field])
+                bucket[f"{field}_max"] = max(bucket[f"{field}_max"], row[field])
+                bucket[f"{field}_sum"] += row[field]
+    return list(buckets.values())
+
+def _merge_values(db: Session, excluded):
+    postgres = db.get_bind().dialect.name == "postgresql"
+    # SQLite's scalar min()/max() take several arguments; Postgres spells them least()/greatest().
+    lower = func.least if postgres else func.min
+    upper = func.greatest if postgres else func.max
+    values = {"readings": WeatherRollup.readings + excluded.readings}
+    for field in AGGREGATE_FIELDS:
+        values[f"{field}_min"] = lower(getattr(WeatherRollup, f"{field}_min"), getattr(excluded, f"{field}_min"))
+        values[f"{field}_max"] = upper(getattr(WeatherRollup, f"{field}_max"), getattr(excluded, f"{field}_max"))
+        values[f"{field}_sum"] = getattr(WeatherRollup, f"{field}_sum") + getattr(excluded, f"{field}_sum")
+    return values
+
+def upsert_rollups(db: Session, rows: list):
+    buckets = _bucket_rows(rows)
+    if not buckets:
+        return 0
+
+    stmt = dialect_insert(db, WeatherRollup)
+    if stmt is not None:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tenant_id", "city", "granularity", "bucket_start"],
+            set_=_merge_values(db, stmt.excluded),
+        )
+        db.execute(stmt, buckets)
+        return len(buckets)
+
+    for bucket in buckets:
+        current = db.execute(
+            select(WeatherRollup)
+            .where(
+                WeatherRollup.city == bucket["city"],
+                WeatherRollup.granularity == bucket["granularity"],
+                WeatherRollup.bucket_start == bucket["bucket_start"],
+            )
+        ).scalar()
+        if current is None:
+            db.execute(insert(WeatherRollup).values(**bucket))
+            continue
+        current.readings += bucket["readings"]
+        for field in AGGREGATE_FIELDS:
+            setattr(current, f"{field}_min", min(getattr(current, f"{field}_min"), bucket[f"{field}_min"]))
+            setattr(current, f"{field}_max", max(getattr(current, f"{field}_max"), bucket[f"{field}_max"]))
+            setattr(current, f"{field}_sum", getattr(current, f"{field}_sum") + bucket[f"{field}_sum"])
+    return len(buckets)
+
+def upsert_latest(db: Session, rows: list):
+    latest = {}
+    for row in rows:
+        current = latest.get(row["city"])
+        if current is None or row["recorded_at"] >= current["recorded_at"]:
+            latest[row["city"]] = row
+    if not latest:
+        return 0
+
+    rows = list(latest.values())
+    stmt = dialect_insert(db, WeatherLatest)
+    if stmt is not None:
+        # Readings that arrive out of order never overwrite a newer one.
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tenant_id", "city"],
+            set_={field: getattr(stmt.excluded, field) for field in READING_FIELDS + ("recorded_at",)},
+            where=WeatherLatest.recorded_at <= stmt.excluded.recorded_at,
+        )
+        db.execute(stmt, rows)
+        return len(rows)
+
+    for row in rows:
+        result = db.execute(
+            update(WeatherLatest)
+            .where(WeatherLatest.city == row["city"], WeatherLatest.recorded_at <= row["recorded_at"])
+            .values(**row)
+        )
+        if result.rowcount == 0 and db.execute(select(WeatherLatest.id).where(WeatherLatest.city == row["city"])).scalar() is None:
+            db.execute(insert(WeatherLatest).values(**row))
+    return len(rows)
+
+def ingest_readings(db: Session, records: list):
+    now = datetime.utcnow()
+    rows = [
+        {
+            "city": record["city"],
+            **{field: record[field] for field in READING_FIELDS},
+            "recorded_at": _recorded_at(record, now),
+        }
+        for record in records
+    ]
+    stats = bulk_insert(db, WeatherData, rows)
+    upsert_latest(db, rows)
+    upsert_rollups(db, rows)
+    return stats
+
+def compact(db: Session, raw_days: int = WEATHER_RAW_RETENTION_DAYS, hourly_days: int = WEATHER_HOURLY_RETENTION_DAYS):
+    # Raw readings are already folded into the hourly and daily rollups on ingest, so this only deletes.
+    # Retention is the same for every tenant, so one pass covers them all.
+    now = datetime.utcnow()
+    raw = db.execute(
+        delete(WeatherData).where(WeatherData.recorded_at < now - timedelta(days=raw_days)),
+        execution_options={"all_tenants": True}
+    ).rowcount
+    hourly = db.execute(
+        delete(WeatherRollup)
+        .where(WeatherRollup.granularity == "hour", WeatherRollup.bucket_start < now - timedelta(days=hourly_days)),
+        execution_options={"all_tenants": True}
+    ).rowcount
+    return {"raw_deleted": raw, "hourly_deleted": hourly}
+
+def compact_if_due(db: Session):
+    global _last_compacted
+    if _last_compacted is not None and time.monotonic() - _last_compacted < WEATHER_COMPACT_INTERVAL:
+        return None
+    _last_compacted = time.monotonic()
+    return compact(db)
+
+def rebuild(db: Session):
+    oldest_raw = db.execute(select(func.min(WeatherData.recorded_at))).scalar()
+    if oldest_raw is None:
+        return 0
+    rebuilt = 0
+    for granularity, truncate in GRANULARITIES.items():
+        since = truncate(oldest_raw)
+        # A rollup at or before the oldest raw reading means older readings were compacted away;
+        # that bucket cannot be recomputed, so it is kept and the rebuild starts at the next one.
+        compacted = db.execute(
+            select(WeatherRollup.id)
+            .where(WeatherRollup.granularity == granularity, WeatherRollup.bucket_start <= since)
+            .limit(1)
+        ).scalar()
+        if compacted is not None:
+            since += NEXT_BUCKET[granularity]
+        db.execute(
+            delete(WeatherRollup)
+            .where(WeatherRollup.granularity == granularity, WeatherRollup.bucket_start >= since)
+        )
+        rows = [
+            dict(row._mapping)
+            for row in db.execute(
+                select(WeatherData.city, WeatherData.recorded_at, *[getattr(WeatherData, field) for field in AGGREGATE_FIELDS])
+                .where(WeatherData.recorded_at >= since)
+            )
+        ]
+        buckets = [bucket for bucket in _bucket_rows(rows) if bucket["granularity"] == granularity]
+        if buckets:
+            db.execute(insert(WeatherRollup), buckets)
+        rebuilt += len(buckets)
+
+    newest = (
+        select(WeatherData.tenant_id, WeatherData.city, func.max(WeatherData.recorded_at).label("recorded_at"))
+        .group_by(WeatherData.tenant_id, WeatherData.city)
+        .subquery()
+    )
+    latest = [
+        dict(row._mapping)
+        for row in db.execute(
+            select(WeatherData.city, WeatherData.recorded_at, *[getattr(WeatherData, field) for field in READING_FIELDS])
+            .join(newest, (WeatherData.tenant_id == newest.c.tenant_id) & (WeatherData.city == newest.c.city) & (WeatherData.recorded_at == newest.c.recorded_at))
+        )
+    ]
+    upsert_latest(db, latest)
+    return rebuilt
+
+def ensure_weather_store(db: Session):
+    for tenant in tenant_ids(db, WeatherData):
+        with tenant_scope(tenant):
+            has_rollups = db.execute(select(select(WeatherRollup.id).exists())).scalar()
+            has_rows = db.execute(select(select(WeatherData.id).exists())).scalar()
+            if has_rows and not has_rollups:
+                rebuild(db)
+    db.commit()
+
+def latest_readings(db: Session):
+    return db.execute(select(WeatherLatest).order_by(WeatherLatest.city)).scalars().all()
+
+def rollup_series(db: Session, granularity: str = "day", days: int = 7, city: str = None):
+    query = (
+        select(WeatherRollup)
+        .where(WeatherRollup.granularity == granularity, WeatherRollup.bucket_start >= datetime.utcnow() - timedelta(days=days))
+        .order_by(WeatherRollup.bucket_start.desc(), WeatherRollup.city)
+    )
+    if city:
+        query = query.where(WeatherRollup.city == city)
+    return [
+        {
+            "city": rollup.city,
+            "bucket_start": rollup.bucket_start,
+            "readings": rollup.readings,
+            **{
+                field: {
+                    "min": getattr(rollup, f"{field}_min"),
+                    "max": getattr(rollup, f"{field}_max"),
+                    "avg": round(getattr(rollup, f"{field}_sum") / rollup.readings, 1) if rollup.readings else None,
+                }
+                for field in AGGREGATE_FIELDS
+            },
+        }
+        for rollup in db.execute(query).scalars()
+    ]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the weather time-series tables")
+    parser.add_argument("command", choices=["compact", "rebuild"])
+    parser.add_argument("--raw-days", type=int, default=WEATHER_RAW_RETENTION_DAYS)
+    parser.add_argument("--hourly-days", type=int, default=WEATHER_HOURLY_RETENTION_DAYS)
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if args.command == "compact":
+            result = compact(db, raw_days=args.raw_days, hourly_days=args.hourly_days)
+            print(f"deleted {result['raw_deleted']} raw readings and {result['hourly_deleted']} hourly rollups")
+        else:
+            for tenant in tenant_ids(db, WeatherData):
+                with tenant_scope(tenant):
+                    print(f"{tenant}: rebuilt {rebuild(db)} weather rollup buckets")
+        db.commit()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import os
+import hmac
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from sqlalchemy.orm import Session
+
+from database import run_db
+from integrations import parse_stripe_charge, parse_github_issue
+from pipeline import write_stripe_payments, write_github_issues, data_changed
+from tenancy import DEFAULT_TENANT, TENANTS, tenant_scope
+
+logger = logging.getLogger(__name__)
+
+STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET", "")
+GITHUB_WEBHOOK_SECRET = os.environ.get("GITHUB_WEBHOOK_SECRET", "")
+# Seconds a Stripe-Signature timestamp may differ from now before the delivery is treated as a replay.
+STRIPE_WEBHOOK_TOLERANCE = int(os.environ.get("STRIPE_WEBHOOK_TOLERANCE", "300"))
+
+WEBHOOK_BATCH_SIZE = int(os.environ.get("WEBHOOK_BATCH_SIZE", "500"))
+WEBHOOK_FLUSH_INTERVAL = float(os.environ.get("WEBHOOK_FLUSH_INTERVAL", "0.05"))
+# Deliveries waiting on a flush; past this, new ones get 503 + Retry-After and the sender redelivers later.
+WEBHOOK_QUEUE_SIZE = int(os.environ.get("WEBHOOK_QUEUE_SIZE", "10000"))
+
+WEBHOOK_SECRETS = {
+    "stripe": STRIPE_WEBHOOK_SECRET,
+    "github": GITHUB_WEBHOOK_SECRET,
+}
+
+WEBHOOK_WRITERS = {
+    "stripe": write_stripe_payments,
+    "github": write_github_issues,
+}
+
+def webhook_secret(source: str, tenant: str):
+    # Each tenant signs with its own secret, so a delivery can only land in the tenant whose secret signed it.
+    # The unsuffixed secret belongs to DEFAULT_TENANT alone.
+    if tenant not in TENANTS:
+        return ""
+    secret = os.environ.get(f"{source.upper()}_WEBHOOK_SECRET_{tenant.upper().replace('-', '_')}", "")
+    if not secret and tenant == DEFAULT_TENANT:
+        secret = WEBHOOK_SECRETS[source]
+    return secret
+
+def verify_stripe_signature(payload: bytes, header: str, secret: str = STRIPE_WEBHOOK_SECRET, tolerance: int = STRIPE_WEBHOOK_TOLERANCE):
+    if not secret or not header:
+        return False
+    timestamp, signatures = None, []
+    for item in header.split(","):
+        key, _, value = item.strip().partition("=")
+        if key == "t":
+            timestamp = value
+        elif key == "v1":
+            signatures.append(value)
+    if not timestamp or not timestamp.isdigit() or not signatures:
+        return False
+    if abs(time.time() - int(timestamp)) > tolerance:
+        return False
+    expected = hmac.new(secret.encode(), timestamp.encode() + b"." + payload, hashlib.sha256).hexdigest()
+    return any(hmac.compare_digest(expected, signature) for signature in signatures)
+
+def verify_github_signature(payload: bytes, header: str, secret: str = GITHUB_WEBHOOK_SECRET):
+    if not secret or not header:
+        return False
+    expected = "sha256=" + hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, header)
+
+def stripe_event_record(event: dict):
+    # charge.* events carry the whole charge; other event types are acknowledged and ignored.
+    if not str(event.get("type", "")).startswith("charge."):
+        return None
+    record = parse_stripe_charge(event["data"]["object"])
+    # Deliveries arrive out of order and more than once; the event's own time decides which state is newest.
+    if event.get("created"):
+        record["updated_at"] = datetime.utcfromtimestamp(event["created"]).isoformat()
+    return record
+
+def github_event_record(event_type: str, event: dict):
+    if event_type != "issues" or "issue" not in event:
+        return None
+    return parse_github_issue(event["issue"], event["repository"]["full_name"])
+
+def store_webhook_batch(db: Session, source: str, tenant: str, records: list):
+    with tenant_scope(tenant):
+        stats = WEBHOOK_WRITERS[source](db, records)
+        db.commit()
+    return stats
+
+class WebhookBuffer:
+    def __init__(self, batch_size: int = WEBHOOK_BATCH_SIZE, flush_interval: float = WEBHOOK_FLUSH_INTERVAL, max_queue: int = WEBHOOK_QUEUE_SIZE):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._pending = {}
+        self._queued = 0
+        self._wakeup = None
+        self._task = None
+        self._closing = False
+        self.received = 0
+        self.written = 0
+        self.batches = 0
+        self.rejected = 0
+        self.failed_batches = 0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, source: str, tenant: str, record: dict):
+        # Resolves once the batch holding this record is committed, so a 200 to the sender means it is stored.
+        # None: the buffer is full. False: the write failed. Either way the sender should redeliver.
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            return None
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault((source, tenant), []).append((record, future))
+        self._queued += 1
+        self.received += 1
+        if self._queued >= self.batch_size:
+            self._wakeup.set()
+        return await asyncio.shield(future)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._flush()
+            if self._closing and not self._queued:
+                return
+
+    async def _flush(self):
+        for key in list(self._pending):
+            while self._pending[key]:
+                batch = self._pending[key][:self.batch_size]
+                self._pending[key] = self._pending[key][self.batch_size:]
+                self._queued -= len(batch)
+                await self._write(*key, batch)
+            del self._pending[key]
+
+    async def _write(self, source: str, tenant: str, batch: list):
+        try:
+            await run_db(store_webhook_batch, source, tenant, [record for record, _ in batch])
+        except Exception:
+            self.failed_batches += 1
+            logger.exception("Failed to store a batch of %d %s webhook events for tenant %s", len(batch), source, tenant)
+            written = False
+        else:
+            self.batches += 1
+            self.written += len(batch)
+            written = True
+            with tenant_scope(tenant):
+                data_changed()
+        for _, future in batch:
+            if not future.done():
+                future.set_result(written)
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def stats(self):
+        return {
+            "queued": self._queued,
+            "received": self.received,
+            "written": self.written,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "failed_batches": self.failed_batches
+        }
+
+webhook_buffer = WebhookBuffer()